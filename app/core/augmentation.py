@@ -0,0 +1,70 @@
+import threading
+import numpy as np
+from core.config import AUGMENTATION_CONFIG
+from core.hog_extractor import get_hog_extractor
+
+
+class BatchAugmenter:
+    """
+    Tăng cường dữ liệu theo lô trên ảnh xám đã resize, ngay trước HOG.
+    - Danh sách phép biến đổi được dựng một lần từ AUGMENTATION_CONFIG.
+    - Lật ngang là view đảo trục (không tính toán), thay đổi độ sáng là bảng tra
+      (LUT) uint8 áp cho cả lô bằng np.take.
+    - Mỗi ảnh gốc cho ra variants_per_image ảnh: gốc, rồi từng phép biến đổi
+      áp riêng lên ảnh gốc (không kết hợp), như augment_image trước đây.
+    """
+
+    def __init__(self, config=AUGMENTATION_CONFIG, extractor=None):
+        self.extractor = extractor or get_hog_extractor()
+        self.transforms = []
+        if not config.get("enabled", True):
+            return
+        if config.get("hflip", False):
+            self.transforms.append(("hflip", lambda gray: gray[:, :, ::-1]))
+        for factor in config.get("brightness", ()):
+            # Giống ColorJitter(brightness) của albumentations: nhân rồi cắt về [0, 255]
+            lut = np.clip(np.arange(256) * float(factor), 0, 255).astype(np.uint8)
+            self.transforms.append((f"brightness_{factor}", lambda gray, lut=lut: np.take(lut, gray)))
+
+    @property
+    def variants_per_image(self):
+        return 1 + len(self.transforms)
+
+    def apply(self, gray_batch):
+        """
+        - gray_batch: (N, H, W) uint8.
+        - Trả về: (N * variants_per_image, H, W) uint8, các biến thể của ảnh i nằm liền nhau.
+        """
+        gray_batch = np.asarray(gray_batch)
+        count = gray_batch.shape[0]
+        out = np.empty((count, self.variants_per_image) + gray_batch.shape[1:], dtype=np.uint8)
+        out[:, 0] = gray_batch
+        for i, (_, transform) in enumerate(self.transforms, start=1):
+            out[:, i] = transform(gray_batch)
+        return out.reshape((-1,) + gray_batch.shape[1:])
+
+    def extract(self, rois):
+        """
+        Resize một lần, tăng cường và trích xuất HOG cho cả lô ROI.
+        - Trả về: (features float32 (N * variants_per_image, feature_size),
+          valid_mask cùng độ dài) theo thứ tự giống apply().
+        """
+        gray, valid = self.extractor.prepare(rois)
+        features = self.extractor.compute(self.apply(gray))
+        valid = np.repeat(valid, self.variants_per_image)
+        features[~valid] = 0
+        return features, valid
+
+
+_default_augmenter = None
+_default_lock = threading.Lock()
+
+
+def get_augmenter():
+    """BatchAugmenter dùng chung trong process, dựng từ AUGMENTATION_CONFIG."""
+    global _default_augmenter
+    if _default_augmenter is None:
+        with _default_lock:
+            if _default_augmenter is None:
+                _default_augmenter = BatchAugmenter(AUGMENTATION_CONFIG)
+    return _default_augmenter
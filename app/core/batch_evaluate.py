@@ -0,0 +1,216 @@
+"""
+Đánh giá nhận diện hàng loạt trên một thư mục video, không qua giao diện Streamlit.
+
+Chạy trong thư mục app/:
+    python -m core.batch_evaluate ../image/test --output data/eval/test
+    python -m core.batch_evaluate ../image/test --ground-truth truth.csv --workers 4
+    python -m core.batch_evaluate ../image/test --full
+
+- Mỗi video chạy cùng chuỗi phát hiện → HOG → phân loại → bầu chọn như khi điểm danh
+  (core.recognition.recognize_stream), trong một process của ProcessPoolExecutor.
+- Nhãn đúng lấy từ tên file/thư mục con như core.bulk_enroll, hoặc từ CSV "video,name".
+- Kết quả: quyết định từng video, số khung hình đến khi quyết định, độ trễ trung bình
+  theo stage, FPS và độ chính xác, ghi ra <output>.json và <output>.csv.
+- Độ trễ/FPS tính trên mọi khung hình đã xử lý. Quyết định thường có ngay sau vài
+  khung hình, nên dùng --frames N hoặc --full để chạy tiếp (không quyết định lại) và đo
+  thông lượng trên một lượt chạy thật; mỗi process được làm nóng trước khi đo.
+"""
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from core.bulk_enroll import MODEL_PATH, discover_videos, read_manifest
+
+STAGES = ("decode", "detect", "extract", "classify")
+UNKNOWN = "unknown"
+
+_recognizer = None  # Mô hình dùng chung trong mỗi process con
+
+
+def _warm_up(recognizer):
+    """
+    Chạy một lượt phát hiện → HOG → phân loại trên ảnh giả, để việc nạp cascade và
+    cấp phát bộ đệm không bị tính vào khung hình đầu tiên của video đầu tiên.
+    """
+    from core.data_collector.face_data_collector import extract_hog_features_batch
+    from core.face_detection.detector import detect_faces
+
+    detect_faces(np.zeros((480, 640, 3), dtype=np.uint8))
+    features, valid = extract_hog_features_batch([np.full((120, 120, 3), 127, dtype=np.uint8)])
+    recognizer.predict_batch_with_confidence(features[valid])
+
+
+def _init_worker(model_path):
+    global _recognizer
+    import cv2
+    from core.face_detection.recognizer import FaceRecognizer
+
+    cv2.setNumThreads(1)
+    _recognizer = FaceRecognizer.load(model_path)
+    _warm_up(_recognizer)
+
+
+def _evaluate_video(video_path, expected, min_frames=0):
+    """
+    Chạy trong process con: nhận diện một video, trả về một dòng kết quả.
+    - min_frames: số khung hình tối thiểu cần xử lý (math.inf: cả video), xem recognize_stream.
+    """
+    import cv2
+    from core.config import SAMPLING_CONFIG
+    from core.frame_sampler import sample_capture
+    from core.recognition import recognize_stream
+
+    recognizer = _recognizer
+    row = {"video": video_path, "expected": expected}
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        row["error"] = "không mở được video"
+        return row
+    cap = sample_capture(cap, SAMPLING_CONFIG["recognize_strategy"])
+
+    def decide(name, confidence, roi):
+        # Từ chối (unknown) nếu confidence dưới ngưỡng của danh tính được dự đoán
+        return True, str(name) if recognizer.accept(name, confidence) else UNKNOWN
+
+    start = time.perf_counter()
+    try:
+        outcome = recognize_stream(cap, recognizer, decide, min_frames=min_frames)
+    finally:
+        cap.release()
+    seconds = time.perf_counter() - start
+
+    name, confidence, votes = outcome["decision"] or (None, 0.0, 0)
+    decided = outcome["message"] if outcome["recognized"] else UNKNOWN
+    row.update(
+        decided=decided,
+        predicted=None if name is None else str(name),
+        confidence=float(confidence),
+        votes=int(votes),
+        correct=decided == expected,
+        frames=outcome["frames"],
+        frames_to_decision=outcome["frames_to_decision"],
+        seconds=seconds,
+        fps=outcome["frames"] / seconds if seconds > 0 else 0.0,
+    )
+    for stage in STAGES:
+        values = [t[stage] for t in outcome["timings"] if stage in t]
+        row[f"{stage}_ms"] = float(np.mean(values)) * 1000 if values else None
+    return row
+
+
+def evaluate_videos(jobs, model_path=MODEL_PATH, workers=None, min_frames=0):
+    """
+    Đánh giá song song các (video, nhãn đúng).
+    - min_frames: chạy tiếp sau quyết định tới khi đủ số khung hình này (math.inf: cả video).
+    - Trả về: (summary, rows) với rows theo thứ tự của jobs.
+    """
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    rows = [None] * len(jobs)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(model_path,)
+    ) as executor:
+        futures = {
+            executor.submit(_evaluate_video, video_path, expected, min_frames): i
+            for i, (video_path, expected) in enumerate(jobs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                rows[i] = future.result()
+            except Exception as e:
+                rows[i] = {"video": jobs[i][0], "expected": jobs[i][1], "error": str(e)}
+            row = rows[i]
+            status = row.get("error") or (
+                f"{row['decided']} ({'đúng' if row['correct'] else 'sai'}), "
+                f"{row['frames_to_decision']} khung hình, {row['fps']:.1f} FPS"
+            )
+            print(f"[THÔNG TIN] [{done}/{len(jobs)}] {row['video']}: {status}")
+    wall_seconds = time.perf_counter() - start
+
+    evaluated = [row for row in rows if "error" not in row]
+    decided = [row for row in evaluated if row["frames_to_decision"] is not None]
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return float(np.mean(values)) if values else None
+
+    summary = {
+        "videos": len(jobs),
+        "evaluated": len(evaluated),
+        "errors": len(jobs) - len(evaluated),
+        "accuracy": mean([float(row["correct"]) for row in evaluated]),
+        "rejected": sum(row["decided"] == UNKNOWN for row in evaluated),
+        "mean_frames_to_decision": mean([row["frames_to_decision"] for row in decided]),
+        "mean_frames": mean([row["frames"] for row in evaluated]),
+        "mean_fps": mean([row["fps"] for row in evaluated]),
+        "stage_ms": {stage: mean([row[f"{stage}_ms"] for row in evaluated]) for stage in STAGES},
+        "workers": workers,
+        "min_frames": "full" if math.isinf(min_frames) else min_frames,
+        "wall_seconds": wall_seconds,
+        "model_path": model_path,
+    }
+    return summary, rows
+
+
+def write_report(summary, rows, output):
+    """Ghi <output>.json (summary + từng video) và <output>.csv (từng video)."""
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(f"{output}.json", "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "videos": rows}, f, ensure_ascii=False, indent=2)
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(f"{output}.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"[THÀNH CÔNG] Đã ghi kết quả vào {output}.json và {output}.csv")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đánh giá nhận diện hàng loạt trên video.")
+    parser.add_argument("directory", nargs="?", help="Thư mục video (vd. ../image/test)")
+    parser.add_argument("--ground-truth", help='CSV với cột "video,name"')
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="Số process (mặc định số CPU)")
+    parser.add_argument("--output", default="data/eval/report", help="Tiền tố file kết quả")
+    length = parser.add_mutually_exclusive_group()
+    length.add_argument(
+        "--frames", type=int, default=0, help="Xử lý ít nhất N khung hình mỗi video để đo FPS/độ trễ"
+    )
+    length.add_argument("--full", action="store_true", help="Xử lý cả video sau khi quyết định")
+    args = parser.parse_args(argv)
+
+    if args.ground_truth:
+        jobs = read_manifest(args.ground_truth)
+    elif args.directory:
+        jobs = discover_videos(args.directory)
+    else:
+        parser.error("Cần thư mục video hoặc --ground-truth")
+    if not jobs:
+        print("[LỖI] Không tìm thấy video nào.")
+        return 1
+    if not os.path.exists(args.model_path):
+        print(f"[LỖI] Không tìm thấy mô hình: {args.model_path}")
+        return 1
+
+    min_frames = math.inf if args.full else args.frames
+    summary, rows = evaluate_videos(jobs, args.model_path, args.workers, min_frames)
+    write_report(summary, rows, args.output)
+    accuracy = summary["accuracy"]
+    print(
+        f"[THÔNG TIN] Độ chính xác: {accuracy if accuracy is None else f'{accuracy:.3f}'} "
+        f"({summary['evaluated']}/{summary['videos']} video), "
+        f"khung hình đến khi quyết định: {summary['mean_frames_to_decision']}, "
+        f"FPS trung bình: {summary['mean_fps']} ({summary['mean_frames']} khung hình/video)"
+    )
+    return 0 if summary["errors"] == 0 else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
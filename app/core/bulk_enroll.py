@@ -0,0 +1,174 @@
+"""
+Đăng ký hàng loạt từ một thư mục video, không qua giao diện Streamlit.
+
+Chạy trong thư mục app/:
+    python -m core.bulk_enroll ../image/train
+    python -m core.bulk_enroll --manifest videos.csv --workers 8
+
+- Tên người lấy từ tên file bỏ số ở cuối (pele2.mp4 -> "pele"), từ thư mục con
+  (<dir>/<tên>/*.mp4), hoặc từ manifest CSV có cột "video,name".
+- Mỗi video được xử lý trong một process của ProcessPoolExecutor; kết quả được ghi
+  vào tập dữ liệu bằng một lần DatasetStore.append và mô hình được huấn luyện một lần.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from core.dataset_store import DATASET_DIR, get_dataset_store
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+MODEL_PATH = "data/models/model.pkl"
+
+
+def name_from_filename(path):
+    """Tên người từ tên file: bỏ phần mở rộng và số (kèm "_", "-", khoảng trắng) ở cuối."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[\s_\-]*\d+$", "", stem) or stem
+
+
+def discover_videos(directory):
+    """[(đường dẫn video, tên)] trong thư mục: file trực tiếp theo tên file, thư mục con theo tên thư mục."""
+    jobs = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS):
+            jobs.append((entry.path, name_from_filename(entry.name)))
+        elif entry.is_dir():
+            for child in sorted(os.listdir(entry.path)):
+                if child.lower().endswith(VIDEO_EXTENSIONS):
+                    jobs.append((os.path.join(entry.path, child), entry.name))
+    return jobs
+
+
+def read_manifest(path):
+    """[(đường dẫn video, tên)] từ CSV có cột "video,name"; đường dẫn tương đối tính theo file manifest."""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return [
+            (os.path.join(base, row["video"].strip()), row["name"].strip())
+            for row in csv.DictReader(f)
+            if row.get("video") and row.get("name")
+        ]
+
+
+def _init_worker():
+    import cv2
+
+    # Mỗi process đã chạy song song với các process khác, tránh tranh chấp luồng của OpenCV
+    cv2.setNumThreads(1)
+
+
+def _enroll_video(video_path, name, num_samples):
+    """Chạy trong process con: thu thập đặc trưng của một video (không ghi tập dữ liệu)."""
+    import cv2
+    from core.config import SAMPLING_CONFIG
+    from core.augmentation import get_augmenter
+    from core.data_collector.face_data_collector import collect_face_features
+    from core.frame_sampler import sample_capture
+
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return {"video": video_path, "name": name, "error": "không mở được video"}
+    num_original_samples = max(1, -(-num_samples // get_augmenter().variants_per_image))
+    cap = sample_capture(
+        cap,
+        SAMPLING_CONFIG["collect_strategy"],
+        target_frames=num_original_samples * SAMPLING_CONFIG["oversample"],
+    )
+    collected = collect_face_features(cap, name, num_samples)
+    result = {"video": video_path, "name": name, "seconds": time.perf_counter() - start}
+    if collected is None:
+        result["error"] = "không thu thập được khuôn mặt"
+    else:
+        result["features"], result["labels"] = collected
+    return result
+
+
+def bulk_enroll(jobs, dataset_dir=DATASET_DIR, num_samples=30, workers=None):
+    """
+    Thu thập song song cho các (video, tên) rồi ghi vào tập dữ liệu bằng một lần append.
+    - Lọc gần trùng (DIVERSITY_CONFIG) chạy riêng trong từng video: các video của cùng
+      một người không được lọc trùng với nhau.
+    - Trả về: (danh sách kết quả từng video không kèm đặc trưng, số mẫu đã ghi).
+    """
+    workers = workers or os.cpu_count() or 1
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, max(len(jobs), 1)), mp_context=context, initializer=_init_worker
+    ) as executor:
+        futures = [
+            executor.submit(_enroll_video, video_path, name, num_samples) for video_path, name in jobs
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"video": None, "name": None, "error": str(e)}
+            results.append(result)
+            status = result.get("error") or f"{len(result['labels'])} mẫu"
+            print(f"[THÔNG TIN] [{done}/{len(jobs)}] {result['video']} ({result['name']}): {status}")
+
+    collected = [r for r in results if "features" in r]
+    added = 0
+    if collected:
+        features = np.concatenate([r["features"] for r in collected])
+        labels = [label for r in collected for label in r["labels"]]
+        total = get_dataset_store(dataset_dir).append(features, labels)
+        added = len(labels)
+        print(f"[THÀNH CÔNG] Đã ghi {added} mẫu của {len(collected)} video (tổng {total}).")
+    for result in results:
+        result.pop("features", None)
+        result["samples"] = len(result.pop("labels", []))
+    return results, added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đăng ký khuôn mặt hàng loạt từ video.")
+    parser.add_argument("directory", nargs="?", help="Thư mục video (vd. ../image/train)")
+    parser.add_argument("--manifest", help='CSV với cột "video,name"')
+    parser.add_argument("--samples", type=int, default=30, help="Số mẫu cho mỗi video (mặc định 30)")
+    parser.add_argument("--workers", type=int, default=None, help="Số process (mặc định số CPU)")
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--model-type", default=None, help="Mặc định TRAINING_CONFIG['model_type']")
+    parser.add_argument("--no-train", action="store_true", help="Chỉ ghi dữ liệu, không huấn luyện")
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        jobs = read_manifest(args.manifest)
+    elif args.directory:
+        jobs = discover_videos(args.directory)
+    else:
+        parser.error("Cần thư mục video hoặc --manifest")
+    if not jobs:
+        print("[LỖI] Không tìm thấy video nào.")
+        return 1
+    print(f"[THÔNG TIN] {len(jobs)} video của {len({name for _, name in jobs})} người")
+
+    start = time.perf_counter()
+    results, added = bulk_enroll(jobs, args.dataset_dir, args.samples, args.workers)
+    print(f"[THÔNG TIN] Thu thập xong sau {time.perf_counter() - start:.1f}s")
+    failed = [r for r in results if "error" in r]
+    if not added:
+        print("[LỖI] Không thu thập được dữ liệu từ video nào.")
+        return 1
+    if args.no_train:
+        return 0 if not failed else 2
+
+    from core.train_model import update_model
+
+    trained = update_model(
+        model_type=args.model_type, dataset_dir=args.dataset_dir, save_path=args.model_path
+    )
+    if not trained:
+        return 1
+    return 0 if not failed else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,3 +5,93 @@ HOG_CONFIG = {
     "expected_hog_size": 4356
 }
 
+AUGMENTATION_CONFIG = {
+    "enabled": True,
+    "hflip": True,  # Lật ngang
+    "brightness": [1.2, 0.8]  # Hệ số nhân độ sáng, mỗi hệ số tạo thêm một biến thể
+}
+
+DETECTION_CONFIG = {
+    "scale_factor": 1.1,
+    "min_neighbors": 5,
+    "min_size": (30, 30),  # Tính theo độ phân giải gốc
+    "pool_size": 4,  # Số CascadeClassifier tối đa dùng chung trong một process
+    "target_width": 480,  # Thu nhỏ ảnh về chiều rộng này trước khi chạy cascade (None: giữ nguyên)
+    "roi": None  # Vùng quan tâm (x, y, w, h) theo độ phân giải gốc, ví dụ khung cửa ra vào
+}
+
+QUALITY_CONFIG = {
+    "min_brightness": 50,  # Độ sáng trung bình tối thiểu (0-255)
+    "min_sharpness": 100,  # Phương sai Laplacian tối thiểu
+    "min_size": 10,  # Cạnh ngắn tối thiểu của box (px)
+    "sharpness_ref": 500,  # Độ nét/kích thước đạt mức này thì được điểm tối đa
+    "size_ref": 100,
+    "select_best": True  # Video: giữ các khuôn mặt điểm cao nhất thay vì các khuôn mặt đạt chuẩn đầu tiên
+}
+
+DIVERSITY_CONFIG = {
+    "enabled": False,  # Chưa cải thiện độ chính xác trên video mẫu mà làm thiếu mẫu khi video ít chuyển động
+    "min_distance": 0.003,  # Khoảng cách cosine HOG tối thiểu tới các mẫu đã nhận (khung hình liền kề ~0.001; từ 0.02 độ chính xác giảm)
+    "capacity": 256,  # Số vector tối đa giữ trong reservoir
+    "pool_factor": 4  # Video: số ứng viên giữ lại = pool_factor x số khuôn mặt cần, rồi lọc trùng
+}
+
+PIPELINE_CONFIG = {
+    "queue_size": 4,  # Số khung hình tối đa chờ giữa hai stage
+    "detect_workers": 2,
+    "extract_workers": 1,
+    "classify_workers": 1
+}
+
+SAMPLING_CONFIG = {
+    "collect_strategy": "auto",  # all | stride | time | scene | auto
+    "recognize_strategy": "time",
+    "stride": 5,  # Lấy 1 khung hình mỗi `stride` khung hình
+    "interval_sec": 0.2,  # Khoảng thời gian giữa hai khung hình (strategy "time")
+    "scene_threshold": 0.03,  # Chênh lệch trung bình tối thiểu (0-1) giữa hai ảnh thu nhỏ (strategy "scene")
+    "seek_threshold": 30,  # Bước ≥ ngưỡng này thì seek bằng CAP_PROP_POS_FRAMES, nhỏ hơn thì grab()
+    "oversample": 3  # auto: số khung hình đọc cho mỗi khuôn mặt gốc cần thu thập
+}
+
+TRACKING_CONFIG = {
+    "enabled": True,
+    "detect_interval": 5,  # Chạy Haar cascade mỗi N khung hình
+    "min_track_score": 0.6,  # Điểm template matching thấp hơn ngưỡng này thì phát hiện lại
+    "search_margin": 0.25,  # Vùng tìm kiếm mở rộng quanh box cũ (tỉ lệ theo kích thước box)
+    "template_width": 64,  # Thu nhỏ template về chiều rộng này để so khớp nhanh
+    "min_votes": 3  # Số phiếu tối thiểu của một track trước khi quyết định danh tính
+}
+
+TRAINING_CONFIG = {
+    "model_type": "centroid",  # centroid (học tăng dần) | svm | knn | mlp | rf | adaboost | auto
+    "min_test_accuracy": 0.6,  # Không lưu mô hình nếu độ chính xác trên tập test thấp hơn
+    # Giảm chiều trước bộ phân loại: method None | "pca" | "pca_lda" (fisherfaces).
+    # Khi bật, mô hình được huấn luyện lại toàn bộ mỗi lần (không học tăng dần).
+    # whiten=True khuếch đại các thành phần nhiễu khi ít mẫu, nên mặc định tắt.
+    "reduction": {"method": None, "n_components": 64, "whiten": False},
+    # model_type "auto": cross-validate các ứng viên song song rồi chọn theo objective
+    "search": {
+        "cv_folds": 3,
+        "n_jobs": -1,  # Số process của joblib (-1: tất cả các core)
+        "latency_weight": 0.01,  # Trừ bao nhiêu accuracy cho mỗi ms dự đoán một khuôn mặt
+        "report_path": "data/models/model_selection.json",
+        "candidates": {
+            "centroid": {"temperature": [0.02]},
+            "knn": {"n_neighbors": [3, 5]},
+            "svm": {"C": [1, 10]},
+            "rf": {"n_estimators": [100]},
+            "mlp": {"hidden_layer_sizes": [(100,)]},
+            "adaboost": {"n_estimators": [100]}
+        }
+    }
+}
+
+RECOGNITION_CONFIG = {
+    "default_threshold": 0.5,  # Ngưỡng confidence khi mô hình chưa có ngưỡng theo danh tính
+    "target_accept_rate": 0.95,  # Tỉ lệ mẫu đúng (dữ liệu giữ lại) được chấp nhận khi hiệu chỉnh ngưỡng
+    "stranger_reject_rate": 0.5,  # Tỉ lệ người lạ mô phỏng (bỏ lớp thật) bị từ chối ở mỗi khung hình
+    "min_threshold": 0.3,  # Ngưỡng hiệu chỉnh không thấp hơn giá trị này
+    "calibration_split": 0.3,  # Tỉ lệ mẫu mới giữ lại để hiệu chỉnh khi học tăng dần
+    "calibration_rows": 1000,  # Số mẫu cũ (tối đa) lấy làm người lạ khi học tăng dần
+    "max_attempts": 10  # Số khung hình tối đa khi chưa quyết định được
+}
@@ -1,90 +1,117 @@
 import cv2
+import heapq
+import itertools
 import numpy as np
 import os
-import pickle
-from skimage.feature import hog
 from core.face_detection.detector import detect_faces
-from core.config import HOG_CONFIG
-import albumentations as A
+from core.hog_extractor import get_hog_extractor
+from core.augmentation import get_augmenter
+from core.config import DIVERSITY_CONFIG, HOG_CONFIG, PIPELINE_CONFIG, QUALITY_CONFIG
+from core.dataset_store import get_dataset_store
+from core.diversity import DiversityFilter
+from core.frame_pipeline import FramePipeline
+from core.quality import score_faces
 
 
-def augment_image(image):
-    if not isinstance(image, np.ndarray):
-        print(f"[ERROR] Input image is not a NumPy array: {type(image)}")
-        return []
-
-    augmented_images = [image]
-
-    transforms = [
-        A.HorizontalFlip(p=1.0),
-        A.ColorJitter(brightness=(1.2, 1.2), p=1.0),  # Tăng độ sáng
-        A.ColorJitter(brightness=(0.8, 0.8), p=1.0)   # Giảm độ sáng
-    ]
-
-    for transform in transforms:
-        try:
-            augmented = transform(image=image)
-            augmented_images.append(augmented['image'])
-        except Exception as e:
-            print(f"[ERROR] Error during augmentation: {e}")
-
-    return augmented_images
+def extract_hog_features_batch(rois):
+    """
+    Trích xuất đặc trưng HOG cho nhiều ROI trong một lần gọi (xem core.hog_extractor).
+    - rois: Danh sách vùng ảnh khuôn mặt (BGR).
+    - Trả về: (features float32 (N, expected_hog_size), valid_mask (N,) bool).
+    """
+    return get_hog_extractor().extract(rois)
 
 def extract_hog_features(roi, size=(100, 100)):
     """
     Trích xuất đặc trưng HOG từ vùng ảnh (ROI).
     - roi: Vùng ảnh chứa khuôn mặt (BGR).
-    - size: Kích thước resize ảnh (mặc định 100x100).
+    - size: Kích thước resize ảnh, phải khớp HOG_CONFIG["image_size"].
     - Trả về: Đặc trưng HOG dạng vector.
     """
-    
+    if tuple(size) != tuple(HOG_CONFIG["image_size"]):
+        print(f"[ERROR] Kích thước {size} không khớp HOG_CONFIG {HOG_CONFIG['image_size']}")
+        return None
     if roi.shape[0] < 10 or roi.shape[1] < 10:
         print(f"[ERROR] ROI quá nhỏ: {roi.shape}")
         return None
     try:
-        
-        resized = cv2.resize(roi, size)
-        gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
-        features, _ = hog(
-            gray, 
-            pixels_per_cell=(8, 8), 
-            cells_per_block=(2, 2), 
-            visualize=True
-        )
-        print(f"[DEBUG] HOG features shape: {features.shape}")
-        if features.shape[0] != HOG_CONFIG["expected_hog_size"]:
-            print(f"[ERROR] Kích thước HOG ({features.shape[0]}) không khớp với kỳ vọng ({HOG_CONFIG['expected_hog_size']})")
+        features, valid = extract_hog_features_batch([roi])
+        if not valid[0]:
             return None
-        return features
+        return features[0]
     except Exception as e:
         print(f"[ERROR] Lỗi khi trích xuất HOG: {e}")
         return None
 
 def is_good_quality(frame, x, y, w, h):
-    """Kiểm tra chất lượng ảnh khuôn mặt dựa trên độ sáng và độ nét."""
-    roi = frame[y:y+h, x:x+w]
-    if roi.shape[0] < 10 or roi.shape[1] < 10:
-        print(f"[ERROR] ROI quá nhỏ: {roi.shape}")
-        return False
-    
+    """Kiểm tra chất lượng một khuôn mặt (độ sáng, độ nét, kích thước, góc mặt), xem core.quality."""
     try:
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        brightness = gray.mean()
-        sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
-        print(f"[DEBUG] Brightness: {brightness}, Sharpness: {sharpness}")
-        return brightness > 50 and sharpness > 100
+        return bool(score_faces(frame, [(x, y, w, h)])["passed"][0])
     except Exception as e:
         print(f"[ERROR] Lỗi khi kiểm tra chất lượng: {e}")
         return False
 
 
-def collect_face_data(cap, name, save_dir="data/dataset", num_samples=10, display_callback=None):
-    os.makedirs(save_dir, exist_ok=True)
-    
+def build_collection_stages():
+    """
+    Tạo các stage phát hiện → kiểm tra chất lượng + tăng cường + HOG cho FramePipeline.
+    result.data["samples"] chứa, cho từng khuôn mặt, lô HOG hợp lệ hoặc None nếu chất lượng kém;
+    result.data["scores"] là điểm chất lượng tương ứng (core.quality.score_faces).
+    """
+
+    def detect_stage(result):
+        result.data["faces"] = detect_faces(result.frame)
+        return result
+
+    augmenter = get_augmenter()
+
+    def extract_stage(result):
+        frame = result.frame
+        samples = [None] * len(result.data["faces"])
+        # Chấm chất lượng mọi khuôn mặt trong khung hình trong một lượt
+        quality = score_faces(frame, result.data["faces"])
+        good = np.flatnonzero(quality["passed"]).tolist()
+        if good:
+            rois = [frame[y:y+h, x:x+w] for (x, y, w, h) in (result.data["faces"][i] for i in good)]
+            # Một lần resize + tăng cường + HOG cho mọi khuôn mặt đạt chất lượng trong khung hình
+            features, valid = augmenter.extract(rois)
+            per_face = augmenter.variants_per_image
+            for k, i in enumerate(good):
+                rows = slice(k * per_face, (k + 1) * per_face)
+                samples[i] = features[rows][valid[rows]]
+        result.data["samples"] = samples
+        result.data["scores"] = quality["score"]
+        return result
+
+    return [
+        ("detect", detect_stage, PIPELINE_CONFIG["detect_workers"]),
+        ("extract", extract_stage, PIPELINE_CONFIG["extract_workers"]),
+    ]
+
+
+def collect_face_features(cap, name, num_samples=10, display_callback=None, live=False):
+    """
+    Thu thập đặc trưng HOG (kèm tăng cường) cho một người, không ghi vào tập dữ liệu.
+    - live=True (webcam): dừng ngay khi đủ num_samples mẫu đạt chuẩn.
+    - Video (QUALITY_CONFIG["select_best"]): duyệt hết các khung hình được lấy mẫu và
+      giữ các khuôn mặt có điểm chất lượng cao nhất; mỗi khung hình chỉ xét khuôn mặt
+      lớn nhất (người đang đăng ký).
+    - DIVERSITY_CONFIG["enabled"]: bỏ khuôn mặt gần trùng (HOG gốc quá gần một khuôn mặt
+      đã nhận), các biến thể tăng cường đi theo khuôn mặt gốc.
+    - Trả về: (features float32 (N, expected_hog_size), labels) hoặc None nếu thất bại.
+    """
     collected_faces = []
     collected_labels = []
     original_count = 0  # Đếm số khuôn mặt gốc thu thập
-    num_original_samples = num_samples // 4 # Mỗi mẫu gốc tạo 4 mẫu (gốc + 3 tăng cường)
+    # Mỗi mẫu gốc tạo variants_per_image mẫu (gốc + các biến thể tăng cường)
+    variants = get_augmenter().variants_per_image
+    num_original_samples = num_samples // variants
+    select_best = not live and QUALITY_CONFIG["select_best"]
+    best = []  # min-heap (điểm, thứ tự, lô HOG) của tối đa num_best khuôn mặt tốt nhất
+    num_best = max(1, -(-num_samples // variants))
+    diversity = DiversityFilter() if DIVERSITY_CONFIG["enabled"] else None
+    pool_size = num_best * (DIVERSITY_CONFIG["pool_factor"] if diversity is not None else 1)
+    order = itertools.count()
     print(f"[INFO] Bắt đầu thu thập dữ liệu cho '{name}'...")
 
     try:
@@ -92,98 +119,113 @@ def collect_face_data(cap, name, save_dir="data/dataset", num_samples=10, displa
         ret, frame = cap.read()
         if not ret:
             print("[ERROR] Không thể đọc khung hình từ webcam/video")
-            return False
+            return None
         height, width = frame.shape[:2]
         if width < 640 or height < 480:
             print(f"[WARNING] Độ phân giải thấp ({width}x{height}), có thể ảnh hưởng đến phát hiện khuôn mặt")
         cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Reset về khung hình đầu tiên
 
 
-        while cap.isOpened() and len(collected_faces) < num_samples:
-            ret, frame = cap.read()
-            if not ret:
-                print("[DEBUG] Failed to read frame.")
-                break
-            
-            faces = detect_faces(frame)
-            print(f"[DEBUG] Detected {len(faces)} faces")
-            
-            for (x, y, w, h) in faces:
-                print(f"[DEBUG] Face ROI: x={x}, y={y}, w={w}, h={h}")
-                
-                if is_good_quality(frame, x, y, w, h):
-                    roi = frame[y:y+h, x:x+w]
-                    augmented_images = augment_image(roi)
-                    for aug_img in augmented_images:
-                        hog_features = extract_hog_features(aug_img)
-                        if hog_features is not None:
+        with FramePipeline(cap, build_collection_stages(), drop_frames=live) as pipeline:
+            for result in pipeline:
+                frame = result.frame
+                if result.error is not None:
+                    print(f"[ERROR] Bỏ qua khung hình lỗi: {result.error}")
+                    continue
+
+                faces = result.data["faces"]
+                print(f"[DEBUG] Detected {len(faces)} faces")
+
+                # Chọn tốt nhất: mỗi khung hình chỉ xét khuôn mặt lớn nhất (người đang đăng ký);
+                # box phụ (người phía sau, phát hiện nhầm) thường nét hơn và sẽ chiếm hết pool
+                subject = max(range(len(faces)), key=lambda i: faces[i][2] * faces[i][3]) if len(faces) else None
+                for i, ((x, y, w, h), hog_batch, score) in enumerate(zip(faces, result.data["samples"], result.data["scores"])):
+                    if hog_batch is not None and select_best:
+                        if len(hog_batch) == 0 or i != subject:
+                            continue
+                        item = (float(score), next(order), hog_batch)
+                        if len(best) < pool_size:
+                            heapq.heappush(best, item)
+                        elif item[0] > best[0][0]:
+                            heapq.heapreplace(best, item)
+                    elif hog_batch is not None:
+                        if len(hog_batch) == 0:
+                            continue
+                        if diversity is not None and not diversity.offer(hog_batch[0])[0]:
+                            print("[DEBUG] Skipping near-duplicate face")
+                            continue
+                        for hog_features in hog_batch:
                             collected_faces.append(hog_features)
                             collected_labels.append(name)
-                            print(f"[DEBUG] Collected face {len(collected_faces)}/{num_samples}")
-                    
-                    original_count += 1  # Tăng đếm khuôn mặt gốc
-                    print(f"[DEBUG] Original faces collected: {original_count}/{num_original_samples}")
-                    if len(collected_faces) >= num_samples:
-                        break
-                else:
-                    print("[DEBUG] Skipping low-quality face")
-                    if display_callback:
-                        cv2.putText(frame, "Poor quality", (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                        print(f"[DEBUG] Collected face {len(collected_faces)}/{num_samples}")
+
+                        original_count += 1  # Tăng đếm khuôn mặt gốc
+                        print(f"[DEBUG] Original faces collected: {original_count}/{num_original_samples}")
+                        if len(collected_faces) >= num_samples:
+                            break
+                    else:
+                        print("[DEBUG] Skipping low-quality face")
+                        if display_callback:
+                            cv2.putText(frame, "Poor quality", (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                if display_callback:
+                    collected = len(collected_faces) or min(len(best), num_best) * variants
+                    for (x, y, w, h) in faces:
+                        frame = cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                        cv2.putText(frame, f"{collected}/{num_samples}", (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    display_callback(frame, collected, num_samples)
                 if len(collected_faces) >= num_samples:
                     break
-            if display_callback:
-                for (x, y, w, h) in faces:
-                    frame = cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    cv2.putText(frame, f"{len(collected_faces)}/{num_samples}", (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                display_callback(frame, len(collected_faces), num_samples)
+
+        if select_best:
+            kept = 0
+            for score, _, hog_batch in sorted(best, reverse=True):
+                if diversity is not None and not diversity.offer(hog_batch[0])[0]:
+                    continue
+                kept += 1
+                collected_faces.extend(hog_batch)
+                collected_labels.extend([name] * len(hog_batch))
+                if len(collected_faces) >= num_samples:
+                    break
+            print(f"[DEBUG] Giữ {kept}/{len(best)} khuôn mặt ứng viên tốt nhất, không trùng lặp")
 
     except Exception as e:
         print(f"[ERROR] Lỗi khi thu thập dữ liệu: {e}")
-        return False
+        return None
     finally:
         cap.release()
 
     if not collected_faces:
         print("[ERROR] Không thu thập được khuôn mặt.")
-        return False
+        return None
 
-    collected_faces = np.array(collected_faces)
+    collected_faces = np.asarray(collected_faces, dtype=np.float32)
     print(f"[DEBUG] Collected faces shape: {collected_faces.shape}")
     print(f"[DEBUG] Collected labels length: {len(collected_labels)}")
 
-    face_path = os.path.join(save_dir, "faces.pkl")
-    label_path = os.path.join(save_dir, "names.pkl")
     expected_size = HOG_CONFIG["expected_hog_size"]
+    if collected_faces.shape[1] != expected_size:
+        print(f"[ERROR] HOG size mismatch: {collected_faces.shape[1]} vs {expected_size}")
+        return None
+    return collected_faces, collected_labels
+
+
+def collect_face_data(cap, name, save_dir="data/dataset", num_samples=10, display_callback=None, live=False):
+    """
+    Thu thập đặc trưng bằng collect_face_features() rồi ghi thêm vào tập dữ liệu.
+    - Trả về: số mẫu thực sự đã ghi (0 nếu thất bại); có thể ít hơn num_samples vì
+      khuôn mặt chất lượng thấp/gần trùng nhau bị loại.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    collected = collect_face_features(cap, name, num_samples, display_callback, live)
+    if collected is None:
+        return 0
+    collected_faces, collected_labels = collected
 
     try:
-        if len(collected_faces) > 0 and collected_faces.shape[1] != expected_size:
-            print(f"[ERROR] HOG size mismatch: {collected_faces.shape[1]} vs {expected_size}")
-            return False
-        old_faces = np.array([]).reshape(0, expected_size)
-        old_labels = []
-        if os.path.exists(face_path):
-            with open(face_path, 'rb') as f:
-                old_faces = pickle.load(f)
-            print(f"[DEBUG] Old faces shape: {old_faces.shape}")
-            if old_faces.shape[1] != expected_size:
-                print(f"[ERROR] Old faces size mismatch: {old_faces.shape[1]} vs {expected_size}")
-                print(f"[INFO] Please delete {face_path} and {label_path}")
-                return False
-        if os.path.exists(label_path):
-            with open(label_path, 'rb') as f:
-                old_labels = pickle.load(f)
-            print(f"[INFO] Existing labels: {set(old_labels)}")
-        collected_faces = np.vstack([old_faces, collected_faces]) if old_faces.size else collected_faces
-        collected_labels = old_labels + collected_labels
-        if collected_faces.shape[0] != len(collected_labels):
-            print(f"[ERROR] Mismatch: faces={collected_faces.shape[0]}, labels={len(collected_labels)}")
-            return False
-        with open(face_path, 'wb') as f:
-            pickle.dump(collected_faces, f)
-        with open(label_path, 'wb') as f:
-            pickle.dump(collected_labels, f)
-        print(f"[SUCCESS] Đã lưu {len(collected_labels)} ảnh và nhãn.")
-        return True
+        # Chỉ ghi thêm mẫu mới, không đọc lại dữ liệu cũ
+        total = get_dataset_store(save_dir).append(collected_faces, collected_labels)
+        print(f"[SUCCESS] Đã lưu {len(collected_labels)} ảnh và nhãn (tổng {total}).")
+        return len(collected_labels)
     except Exception as e:
         print(f"[ERROR] Failed to save dataset: {e}")
-        return False
\ No newline at end of file
+        return 0
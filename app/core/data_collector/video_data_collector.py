@@ -2,6 +2,9 @@ import cv2
 import os
 import streamlit as st
 from .face_data_collector import collect_face_data
+from core.augmentation import get_augmenter
+from core.config import SAMPLING_CONFIG
+from core.frame_sampler import sample_capture
 
 def collect_data_from_uploaded_video(
     video_path, name, save_dir="data/dataset", num_samples=100
@@ -12,23 +15,32 @@ def collect_data_from_uploaded_video(
     - name: Tên người cần gắn nhãn.
     - save_dir: Thư mục lưu dữ liệu.
     - num_samples: Số lượng mẫu thu thập.
+    - Trả về: số mẫu đã lưu (0 nếu thất bại).
     """
     if not os.path.exists(video_path):
         st.error(f"❌ Video không tồn tại tại: {video_path}")
         print(f"[ERROR] Video file does not exist: {video_path}")
-        return False
+        return 0
 
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         st.error("❌ Không thể đọc file video.")
         print(f"[ERROR] Failed to open video: {video_path}")
-        return False
+        return 0
 
     # Kiểm tra thông tin video
     fps = cap.get(cv2.CAP_PROP_FPS)
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     print(f"[DEBUG] Video info: FPS={fps}, Total frames={frame_count}")
 
+    # Chỉ giải mã một phần video: các khung hình liền kề cho khuôn mặt gần như trùng nhau
+    num_original_samples = max(1, -(-num_samples // get_augmenter().variants_per_image))
+    cap = sample_capture(
+        cap,
+        SAMPLING_CONFIG["collect_strategy"],
+        target_frames=num_original_samples * SAMPLING_CONFIG["oversample"],
+    )
+
     progress = st.progress(0)
     display = st.empty()
 
@@ -47,8 +59,14 @@ def collect_data_from_uploaded_video(
     try:
         result = collect_face_data(cap, name, save_dir, num_samples, display_callback)
         if result:
-            st.success(f"✅ Thu thập thành công {num_samples} mẫu cho {name}")
-            print(f"[SUCCESS] Thu thập thành công cho {name}")
+            if result < num_samples:
+                st.warning(
+                    f"⚠️ Chỉ lưu được {result}/{num_samples} mẫu cho {name}: khuôn mặt mờ hoặc gần "
+                    "trùng nhau đã bị loại. Nên thu thập thêm với góc mặt, ánh sáng khác."
+                )
+            else:
+                st.success(f"✅ Thu thập thành công {result} mẫu cho {name}")
+            print(f"[SUCCESS] Thu thập thành công {result}/{num_samples} mẫu cho {name}")
         else:
             st.error(
                 f"❌ Không thu thập được dữ liệu cho {name}. Vui lòng kiểm tra video (đảm bảo có khuôn mặt rõ ràng, ánh sáng tốt)."
@@ -58,7 +76,7 @@ def collect_data_from_uploaded_video(
     except Exception as e:
         st.error(f"❌ Lỗi khi thu thập dữ liệu từ video: {e}")
         print(f"[ERROR] Lỗi khi thu thập dữ liệu từ video: {e}")
-        return False
+        return 0
     finally:
         cap.release()
         display.empty()
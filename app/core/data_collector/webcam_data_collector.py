@@ -9,12 +9,13 @@ def collect_data_from_webcam(name, save_dir="data/dataset", num_samples=10, came
     - save_dir: Thư mục lưu dữ liệu.
     - num_samples: Số lượng mẫu thu thập.
     - camera_index: Chỉ số webcam.
+    - Trả về: số mẫu đã lưu (0 nếu thất bại).
     """
     cap = cv2.VideoCapture(camera_index)
     if not cap.isOpened():
         st.error(f"❌ Không mở được webcam với index {camera_index}.")
         print(f"[ERROR] Failed to open webcam with index {camera_index}")
-        return False
+        return 0
 
     print(f"[DEBUG] Webcam opened with index {camera_index}")
     progress = st.progress(0)
@@ -33,10 +34,16 @@ def collect_data_from_webcam(name, save_dir="data/dataset", num_samples=10, came
             print(f"[ERROR] Lỗi khi hiển thị khung hình qua Streamlit: {e}")
 
     try:
-        result = collect_face_data(cap, name, save_dir, num_samples, display_callback)
+        result = collect_face_data(cap, name, save_dir, num_samples, display_callback, live=True)
         if result:
-            st.success(f"✅ Thu thập thành công {num_samples} mẫu cho {name}")
-            print(f"[SUCCESS] Thu thập thành công cho {name}")
+            if result < num_samples:
+                st.warning(
+                    f"⚠️ Chỉ lưu được {result}/{num_samples} mẫu cho {name}: khuôn mặt mờ hoặc gần "
+                    "trùng nhau đã bị loại. Nên thu thập thêm với góc mặt, ánh sáng khác."
+                )
+            else:
+                st.success(f"✅ Thu thập thành công {result} mẫu cho {name}")
+            print(f"[SUCCESS] Thu thập thành công {result}/{num_samples} mẫu cho {name}")
         else:
             st.error(f"❌ Không thu thập được dữ liệu cho {name}. Vui lòng kiểm tra webcam.")
             print(f"[ERROR] Thu thập thất bại cho {name}")
@@ -44,7 +51,7 @@ def collect_data_from_webcam(name, save_dir="data/dataset", num_samples=10, came
     except Exception as e:
         st.error(f"❌ Lỗi khi thu thập dữ liệu: {e}")
         print(f"[ERROR] Lỗi khi thu thập dữ liệu từ webcam: {e}")
-        return False
+        return 0
     finally:
         cap.release()
         display.empty()
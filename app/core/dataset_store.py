@@ -0,0 +1,342 @@
+import contextlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import numpy as np
+from core.config import HOG_CONFIG
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khoá giữa các luồng trong process
+    fcntl = None
+
+DATASET_DIR = "data/dataset"
+FEATURES_FILE = "features.f32"
+LABELS_FILE = "labels.txt"
+MANIFEST_FILE = "manifest.json"
+LEGACY_FACES_FILE = "faces.pkl"
+LEGACY_LABELS_FILE = "names.pkl"
+
+
+class DatasetStore:
+    """
+    Tập đặc trưng khuôn mặt chỉ ghi nối (append-only).
+    - features.f32: ma trận float32 (count, dim) ghi liên tiếp theo hàng, đọc bằng np.memmap.
+    - labels.txt: mỗi dòng một nhãn, cùng thứ tự với các hàng đặc trưng.
+    - manifest.json: số hàng/byte đã commit, số mẫu theo từng người dùng và version
+      (tăng sau mỗi lần ghi), ghi nguyên tử sau cùng. Dữ liệu nằm ngoài phần đã commit
+      (do lần ghi bị ngắt) bị bỏ qua khi đọc và bị cắt ở lần ghi sau.
+    Mỗi lần thu thập chỉ ghi thêm mẫu mới, không đọc lại toàn bộ tập dữ liệu. Manifest
+    được cache trong bộ nhớ và chỉ đọc lại khi file thay đổi.
+    """
+
+    def __init__(self, root=DATASET_DIR, dim=None):
+        self.root = root
+        self.dim = int(dim or HOG_CONFIG["expected_hog_size"])
+        self.features_path = os.path.join(root, FEATURES_FILE)
+        self.labels_path = os.path.join(root, LABELS_FILE)
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._cached = None  # (chữ ký file, manifest)
+
+    def _empty_manifest(self):
+        return {
+            "format": 1,
+            "version": 0,
+            "dtype": "float32",
+            "dim": self.dim,
+            "count": 0,
+            "labels_bytes": 0,
+            "users": {},
+            "legacy_users": {},
+        }
+
+    def _read_manifest(self, cached=True):
+        """Manifest hiện tại; cached=False luôn đọc từ đĩa và trả về bản có thể sửa."""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return self._empty_manifest()
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        entry = self._cached
+        if cached and entry is not None and entry[0] == signature:
+            return entry[1]
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if "users" not in manifest:
+            # Manifest cũ chưa có số mẫu theo người dùng: đếm lại từ labels.txt
+            manifest["users"] = self._count_labels(manifest)
+        self._cached = (signature, manifest)
+        if cached:
+            return manifest
+        return dict(manifest, users=dict(manifest["users"]))
+
+    def _count_labels(self, manifest):
+        counts = {}
+        for label in self._read_labels(manifest):
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    def manifest(self):
+        """
+        Đọc manifest; nếu chưa có thì chuyển dữ liệu faces.pkl/names.pkl cũ (nếu có),
+        nếu đặc trưng chưa ở dạng float32 thì chuyển đổi một lần.
+        """
+        if not os.path.exists(self.manifest_path):
+            self._migrate_legacy()
+        manifest = self._read_manifest()
+        if "legacy_users" not in manifest:
+            self._seed_legacy_users()
+            manifest = self._read_manifest()
+        if manifest.get("dtype", "float32") != "float32":
+            self._migrate_dtype()
+            manifest = self._read_manifest()
+        return manifest
+
+    def _write_manifest(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".manifest-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Khoá ghi: giữa các luồng và (nếu có fcntl) giữa các process."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, ".lock"), "a") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _append_bytes(path, committed, data):
+        """Cắt file về phần đã commit rồi ghi thêm data, fsync trước khi trả về."""
+        with open(path, "ab") as f:
+            f.truncate(committed)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append_locked(self, manifest, features, labels):
+        label_bytes = "".join(f"{label}\n" for label in labels).encode("utf-8")
+        self._append_bytes(
+            self.features_path,
+            manifest["count"] * manifest["dim"] * 4,
+            np.ascontiguousarray(features).tobytes(),
+        )
+        self._append_bytes(self.labels_path, manifest["labels_bytes"], label_bytes)
+        manifest["count"] += len(labels)
+        manifest["labels_bytes"] += len(label_bytes)
+        manifest["version"] = manifest.get("version", 0) + 1
+        users = manifest.setdefault("users", {})
+        for label in labels:
+            users[label] = users.get(label, 0) + 1
+        self._write_manifest(manifest)
+        return manifest
+
+    def _check(self, manifest, features, labels):
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        labels = [str(label) for label in labels]
+        if features.shape[0] != len(labels):
+            raise ValueError(f"Số mẫu ({features.shape[0]}) không khớp số nhãn ({len(labels)})")
+        if features.shape[1] != manifest["dim"]:
+            raise ValueError(
+                f"Kích thước đặc trưng {features.shape[1]} khác tập dữ liệu {manifest['dim']}"
+            )
+        if any("\n" in label or "\r" in label for label in labels):
+            raise ValueError("Nhãn không được chứa ký tự xuống dòng")
+        return features, labels
+
+    def append(self, features, labels):
+        """
+        Ghi thêm các mẫu mới vào cuối tập dữ liệu.
+        - features: (N, dim), được lưu dạng float32.
+        - labels: N nhãn tương ứng.
+        - Trả về: tổng số mẫu sau khi ghi.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest()  # Chuyển dữ liệu cũ (nếu có) trước khi ghi thêm
+        with self._exclusive():
+            manifest = self._read_manifest(cached=False)
+            features, labels = self._check(manifest, features, labels)
+            if not labels:
+                return manifest["count"]
+            manifest = self._append_locked(manifest, features, labels)
+        print(f"[DEBUG] Đã ghi thêm {len(labels)} mẫu vào {self.root} (tổng {manifest['count']})")
+        return manifest["count"]
+
+    def __len__(self):
+        return self.manifest()["count"]
+
+    def load(self, mmap=True):
+        """
+        Ma trận đặc trưng (count, dim) float32.
+        - mmap=True: ánh xạ file chỉ đọc, không sao chép vào bộ nhớ.
+        """
+        manifest = self.manifest()
+        count, dim = manifest["count"], manifest["dim"]
+        if count == 0:
+            return np.empty((0, dim), dtype=np.float32)
+        if mmap:
+            return np.memmap(self.features_path, dtype=np.float32, mode="r", shape=(count, dim))
+        return np.fromfile(self.features_path, dtype=np.float32, count=count * dim).reshape(
+            count, dim
+        )
+
+    def labels(self):
+        """Danh sách nhãn theo thứ tự các hàng đặc trưng."""
+        return self._read_labels(self.manifest())
+
+    def label_counts(self):
+        """
+        {người dùng: số mẫu}, lấy từ manifest mà không đọc labels.txt.
+        Gồm cả người dùng chỉ có trong names.pkl cũ (không còn đặc trưng), xem legacy_users().
+        """
+        manifest = self.manifest()
+        return {**manifest.get("legacy_users", {}), **manifest["users"]}
+
+    def feature_label_counts(self):
+        """{người dùng: số mẫu} chỉ gồm người dùng có đặc trưng (huấn luyện được)."""
+        return dict(self.manifest()["users"])
+
+    def legacy_users(self):
+        """{người dùng: số nhãn} trong names.pkl cũ khi không có faces.pkl đi kèm."""
+        return dict(self.manifest().get("legacy_users", {}))
+
+    def has_user(self, username):
+        manifest = self.manifest()
+        return username in manifest["users"] or username in manifest.get("legacy_users", {})
+
+    def version(self):
+        """Version tập dữ liệu, tăng sau mỗi lần ghi thêm."""
+        return self.manifest().get("version", 0)
+
+    def _read_labels(self, manifest):
+        if manifest["count"] == 0:
+            return []
+        with open(self.labels_path, "rb") as f:
+            data = f.read(manifest["labels_bytes"])
+        return data.decode("utf-8").splitlines()
+
+    def _migrate_dtype(self, chunk_rows=4096):
+        """Chuyển features.f32 đang lưu kiểu khác (vd. float64) sang float32 theo từng khối."""
+        with self._exclusive():
+            manifest = self._read_manifest(cached=False)
+            dtype = np.dtype(manifest.get("dtype", "float32"))
+            if dtype == np.float32:
+                return
+            count, dim = manifest["count"], manifest["dim"]
+            source = np.memmap(self.features_path, dtype=dtype, mode="r", shape=(count, dim))
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".features-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for start in range(0, count, chunk_rows):
+                        f.write(np.asarray(source[start:start + chunk_rows], dtype=np.float32).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                del source
+                os.replace(tmp_path, self.features_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            manifest["dtype"] = "float32"
+            self._write_manifest(manifest)
+        print(f"[INFO] Đã chuyển {count} mẫu trong {self.root} từ {dtype} sang float32")
+
+    def _legacy_label_counts(self):
+        """Số nhãn theo người dùng trong names.pkl khi không có faces.pkl (dữ liệu chỉ còn nhãn)."""
+        face_path = os.path.join(self.root, LEGACY_FACES_FILE)
+        label_path = os.path.join(self.root, LEGACY_LABELS_FILE)
+        if os.path.exists(face_path) or not os.path.exists(label_path):
+            return {}
+        try:
+            with open(label_path, "rb") as f:
+                labels = pickle.load(f)
+        except Exception as e:
+            print(f"[ERROR] Không đọc được {label_path}: {e}")
+            return {}
+        counts = {}
+        for label in labels:
+            counts[str(label)] = counts.get(str(label), 0) + 1
+        return counts
+
+    def _seed_legacy_users(self):
+        """Ghi legacy_users vào manifest đã có (tạo trước khi có trường này), một lần."""
+        with self._exclusive():
+            manifest = self._read_manifest(cached=False)
+            if "legacy_users" in manifest:
+                return
+            manifest["legacy_users"] = self._legacy_label_counts()
+            self._write_manifest(manifest)
+
+    def _migrate_legacy(self):
+        """
+        Chuyển faces.pkl/names.pkl sang định dạng mới một lần, giữ file cũ dạng *.migrated.
+        Nếu chỉ có names.pkl (đặc trưng không còn), tạo manifest rỗng và ghi số nhãn theo
+        người dùng vào legacy_users để những người này vẫn được coi là đã có dữ liệu; mô hình
+        cũ vẫn nhận diện được họ. names.pkl được giữ nguyên.
+        """
+        face_path = os.path.join(self.root, LEGACY_FACES_FILE)
+        label_path = os.path.join(self.root, LEGACY_LABELS_FILE)
+        if not os.path.exists(label_path):
+            return
+        if not os.path.exists(face_path):
+            with self._exclusive():
+                if os.path.exists(self.manifest_path):
+                    return
+                manifest = self._empty_manifest()
+                manifest["legacy_users"] = self._legacy_label_counts()
+                self._write_manifest(manifest)
+            print(
+                f"[INFO] {label_path} không có {LEGACY_FACES_FILE} đi kèm: giữ "
+                f"{len(manifest['legacy_users'])} người dùng cũ trong manifest"
+            )
+            return
+        with self._exclusive():
+            if os.path.exists(self.manifest_path):
+                return
+            try:
+                with open(face_path, "rb") as f:
+                    faces = pickle.load(f)
+                with open(label_path, "rb") as f:
+                    labels = pickle.load(f)
+                manifest = self._empty_manifest()
+                faces, labels = self._check(manifest, faces, labels)
+                self._append_locked(manifest, faces, labels)
+            except Exception as e:
+                print(f"[ERROR] Không chuyển được {face_path}/{label_path}: {e}")
+                return
+            os.replace(face_path, face_path + ".migrated")
+            os.replace(label_path, label_path + ".migrated")
+        print(f"[INFO] Đã chuyển {len(labels)} mẫu từ {face_path} sang {self.root}")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_dataset_store(root=DATASET_DIR):
+    """DatasetStore dùng chung trong process cho thư mục tương ứng."""
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = DatasetStore(root)
+            _stores[root] = store
+        return store
@@ -0,0 +1,62 @@
+import numpy as np
+from core.config import DIVERSITY_CONFIG
+
+
+class DiversityFilter:
+    """
+    Loại mẫu gần trùng khi thu thập: giữ một "reservoir" các vector đã nhận
+    (chuẩn hoá L2, float32, cấp phát sẵn) và từ chối vector mới có khoảng cách
+    cosine tới reservoir nhỏ hơn min_distance.
+    - Mỗi lần offer() so khớp cả lô ứng viên với reservoir bằng một phép nhân ma trận;
+      các ứng viên trong cùng lô cũng được so với nhau.
+    - Khi reservoir đầy (capacity), vector mới được nhận sẽ ghi đè vector cũ nhất.
+    """
+
+    def __init__(self, min_distance=None, capacity=None):
+        self.min_distance = (
+            DIVERSITY_CONFIG["min_distance"] if min_distance is None else min_distance
+        )
+        self.capacity = capacity or DIVERSITY_CONFIG["capacity"]
+        self._reservoir = None
+        self._size = 0
+        self._next = 0  # Vị trí ghi tiếp theo (vòng tròn khi đầy)
+
+    def __len__(self):
+        return self._size
+
+    def _add(self, vector):
+        if self._reservoir is None:
+            self._reservoir = np.empty((self.capacity, vector.shape[0]), dtype=np.float32)
+        self._reservoir[self._next] = vector
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def offer(self, features):
+        """
+        - features: (N, số chiều) hoặc một vector.
+        - Trả về: mask bool (N,) các vector được nhận (và đã thêm vào reservoir).
+        """
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        candidates = features / np.maximum(norms, 1e-12)
+        if self._size:
+            nearest = (candidates @ self._reservoir[: self._size].T).max(axis=1)
+            accepted = 1.0 - nearest >= self.min_distance
+        else:
+            accepted = np.ones(len(candidates), dtype=bool)
+
+        # Ứng viên trong cùng lô: so với những ứng viên đã nhận trước nó
+        index = np.flatnonzero(accepted)
+        if len(index) > 1:
+            similarity = candidates[index] @ candidates[index].T
+            keep = np.ones(len(index), dtype=bool)
+            for k in range(1, len(index)):
+                if (1.0 - similarity[k, :k][keep[:k]] < self.min_distance).any():
+                    keep[k] = False
+            accepted[index[~keep]] = False
+
+        for vector in candidates[accepted]:
+            self._add(vector)
+        return accepted
@@ -0,0 +1,63 @@
+import numpy as np
+from core.config import RECOGNITION_CONFIG
+
+
+def stranger_scores(probas, classes, actual):
+    """
+    Mô phỏng người lạ: điểm của mỗi mẫu khi lớp thật của nó bị bỏ khỏi mô hình.
+    - Che cột của lớp thật rồi chuẩn hoá lại xác suất; với gallery trọng tâm (softmax
+      của cosine) điều này đúng bằng việc xoá trọng tâm của người đó, với mô hình khác
+      là xấp xỉ. Mẫu có nhãn không thuộc classes được giữ nguyên (đã là người lạ).
+    - Trả về: (nhãn bị nhận nhầm thành, confidence) cho từng mẫu.
+    """
+    classes = np.asarray(classes)
+    probas = np.array(probas, dtype=np.float64)
+    index = {label: i for i, label in enumerate(classes)}
+    own = np.fromiter((index.get(label, -1) for label in actual), dtype=np.intp, count=len(probas))
+    known = np.flatnonzero(own >= 0)
+    probas[known, own[known]] = 0.0
+    probas /= np.maximum(probas.sum(axis=1, keepdims=True), 1e-12)
+    best = probas.argmax(axis=1)
+    return classes[best], probas[np.arange(len(best)), best]
+
+
+def calibrate_thresholds(
+    probas, classes, actual, target_accept=None, stranger_reject=None, min_threshold=None
+):
+    """
+    Ngưỡng chấp nhận theo từng danh tính từ xác suất dự đoán trên dữ liệu hiệu chỉnh.
+    - Ngưỡng gốc: phân vị stranger_reject của điểm người lạ mô phỏng (stranger_scores)
+      bị nhận nhầm thành danh tính đó, tức là từ chối được tỉ lệ đó người lạ giống họ.
+      Điểm này không bị thổi phồng khi mẫu hiệu chỉnh cùng phiên quay với mẫu huấn luyện.
+    - Không cao hơn phân vị chấp nhận target_accept mẫu đúng của lớp, không thấp hơn
+      min_threshold.
+    - Cần ≥3 lớp (bỏ một lớp vẫn còn ≥2 lớp để so sánh); danh tính không có điểm người
+      lạ nào sẽ không có trong kết quả và dùng ngưỡng mặc định.
+    - Trả về: {label: ngưỡng}.
+    """
+    if target_accept is None:
+        target_accept = RECOGNITION_CONFIG["target_accept_rate"]
+    if stranger_reject is None:
+        stranger_reject = RECOGNITION_CONFIG["stranger_reject_rate"]
+    if min_threshold is None:
+        min_threshold = RECOGNITION_CONFIG["min_threshold"]
+    classes = np.asarray(classes)
+    actual = np.asarray(actual)
+    if len(classes) < 3 or len(actual) == 0:
+        return {}
+    probas = np.asarray(probas, dtype=np.float64)
+    predicted = classes[probas.argmax(axis=1)]
+    confidences = probas.max(axis=1)
+    stranger_labels, stranger_confidences = stranger_scores(probas, classes, actual)
+
+    thresholds = {}
+    for label in classes:
+        strangers = stranger_confidences[stranger_labels == label]
+        if strangers.size == 0:
+            continue
+        threshold = float(np.quantile(strangers, stranger_reject))
+        genuine = confidences[(predicted == label) & (actual == label)]
+        if genuine.size:
+            threshold = min(threshold, float(np.quantile(genuine, 1.0 - target_accept)))
+        thresholds[label] = max(threshold, min_threshold)
+    return thresholds
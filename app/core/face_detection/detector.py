@@ -1,10 +1,25 @@
 import cv2
+import numpy as np
 import os
+import queue
+import threading
+from contextlib import contextmanager
+from core.config import DETECTION_CONFIG
+
+# Đường dẫn tính từ vị trí file này, không phụ thuộc thư mục chạy script
+CASCADE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "haarcascade_frontalface_default.xml",
+)
+
+_cascade_xml_cache = {}
+_pools = {}
+_registry_lock = threading.Lock()
+_USE_CONFIG = object()  # Giá trị mặc định: lấy từ DETECTION_CONFIG
 
 
 def get_haar_cascade_path():
-    # Đường dẫn tuyệt đối tính từ vị trí chạy script (app/)
-    cascade_path = "app/core/haarcascade_frontalface_default.xml"
+    cascade_path = CASCADE_PATH
 
     if not os.path.exists(cascade_path):
         raise FileNotFoundError(f"[ERROR] Không tìm thấy cascade: {cascade_path}")
@@ -12,12 +27,146 @@ def get_haar_cascade_path():
     return cascade_path
 
 
-def detect_faces(frame):
-    """Detect faces using Haar Cascade from local XML."""
-    cascade_file = get_haar_cascade_path()
-    face_cascade = cv2.CascadeClassifier(cascade_file)
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(
-        gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
+def _load_cascade_xml(cascade_path):
+    """Đọc nội dung XML của cascade đúng một lần cho mỗi process."""
+    with _registry_lock:
+        xml = _cascade_xml_cache.get(cascade_path)
+        if xml is None:
+            with open(cascade_path, "r", encoding="utf-8") as f:
+                xml = f.read()
+            _cascade_xml_cache[cascade_path] = xml
+            print(f"[DEBUG] Đã nạp cascade XML: {cascade_path}")
+        return xml
+
+
+class DetectorPool:
+    """
+    Pool các CascadeClassifier dùng chung giữa các phiên Streamlit.
+    - XML được đọc một lần, mỗi classifier được dựng từ bộ nhớ.
+    - Mỗi luồng mượn một classifier riêng qua acquire() nên không chia sẻ trạng thái.
+    """
+
+    def __init__(self, cascade_path, max_size=DETECTION_CONFIG["pool_size"]):
+        self.cascade_path = cascade_path
+        self.max_size = max(1, int(max_size))
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create_classifier(self):
+        xml = _load_cascade_xml(self.cascade_path)
+        storage = cv2.FileStorage(xml, cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+        classifier = cv2.CascadeClassifier()
+        if not classifier.read(storage.getFirstTopLevelNode()) or classifier.empty():
+            raise RuntimeError(f"[ERROR] Không thể khởi tạo cascade: {self.cascade_path}")
+        return classifier
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Mượn một classifier; trả lại pool khi ra khỏi khối with."""
+        try:
+            classifier = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.max_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    classifier = self._create_classifier()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                classifier = self._idle.get(timeout=timeout)
+        try:
+            yield classifier
+        finally:
+            self._idle.put(classifier)
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        """Chạy detectMultiScale trên ảnh xám với tham số tuỳ chỉnh cho từng lần gọi."""
+        params = {
+            "scaleFactor": scale_factor or DETECTION_CONFIG["scale_factor"],
+            "minNeighbors": (
+                DETECTION_CONFIG["min_neighbors"] if min_neighbors is None else min_neighbors
+            ),
+            "minSize": tuple(min_size or DETECTION_CONFIG["min_size"]),
+        }
+        with self.acquire() as classifier:
+            return classifier.detectMultiScale(gray, **params)
+
+
+def get_detector_pool(cascade_path=None):
+    """Trả về DetectorPool dùng chung trong process cho cascade tương ứng."""
+    cascade_path = cascade_path or get_haar_cascade_path()
+    with _registry_lock:
+        pool = _pools.get(cascade_path)
+        if pool is None:
+            pool = DetectorPool(cascade_path)
+            _pools[cascade_path] = pool
+        return pool
+
+
+def _clip_roi(roi, frame_w, frame_h):
+    x, y, w, h = (int(v) for v in roi)
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(frame_w, x + w), min(frame_h, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def detect_faces(
+    frame,
+    scale_factor=None,
+    min_neighbors=None,
+    min_size=None,
+    target_width=_USE_CONFIG,
+    roi=_USE_CONFIG,
+):
+    """
+    Detect faces using the shared Haar Cascade pool.
+    - Cascade chạy trên bản thu nhỏ (chiều rộng target_width) của vùng roi,
+      box trả về được quy đổi lại toạ độ khung hình gốc để cắt ROI sắc nét.
+    - min_size tính theo độ phân giải gốc.
+    - Trả về: mảng int (N, 4) các box (x, y, w, h).
+    """
+    if target_width is _USE_CONFIG:
+        target_width = DETECTION_CONFIG["target_width"]
+    if roi is _USE_CONFIG:
+        roi = DETECTION_CONFIG["roi"]
+
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    offset_x = offset_y = 0
+    if roi is not None:
+        roi = _clip_roi(roi, gray.shape[1], gray.shape[0])
+        if roi is None:
+            return np.empty((0, 4), dtype=np.int32)
+        offset_x, offset_y, w, h = roi
+        gray = gray[offset_y:offset_y + h, offset_x:offset_x + w]
+
+    min_size = tuple(min_size or DETECTION_CONFIG["min_size"])
+    scale = 1.0
+    if target_width and gray.shape[1] > target_width:
+        scale = target_width / float(gray.shape[1])
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        min_size = tuple(max(1, int(round(v * scale))) for v in min_size)
+
+    faces = get_detector_pool().detect(
+        gray,
+        scale_factor=scale_factor,
+        min_neighbors=min_neighbors,
+        min_size=min_size,
     )
+    if len(faces) == 0:
+        return np.empty((0, 4), dtype=np.int32)
+
+    faces = np.asarray(faces, dtype=np.float64)
+    if scale != 1.0:
+        faces = faces / scale
+    faces = np.rint(faces).astype(np.int32)
+    faces[:, 0] += offset_x
+    faces[:, 1] += offset_y
     return faces
@@ -0,0 +1,80 @@
+import numpy as np
+from sklearn.base import BaseEstimator
+
+
+class NearestCentroidGallery(BaseEstimator):
+    """
+    Bộ phân loại "gallery": mỗi người là trọng tâm (centroid) của các vector đặc trưng
+    đã chuẩn hoá L2, dự đoán bằng độ tương đồng cosine với từng trọng tâm.
+    - partial_fit() chỉ cộng dồn mẫu mới vào tổng theo lớp, nên thêm một người tốn
+      thời gian tỉ lệ với số mẫu của người đó, không phụ thuộc kích thước tập dữ liệu.
+    - predict_proba() là softmax của cosine / temperature, cùng giao diện với sklearn.
+    """
+
+    def __init__(self, temperature=0.02):
+        self.temperature = temperature
+        self.classes_ = np.empty(0, dtype=object)
+        self._sums = None  # (số lớp, số chiều) float64
+        self._counts = np.empty(0, dtype=np.int64)
+        self._centroids = None
+
+    @staticmethod
+    def _normalize(X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        return X / np.maximum(norms, 1e-12)
+
+    def fit(self, X, y):
+        self.classes_ = np.empty(0, dtype=object)
+        self._sums = None
+        self._counts = np.empty(0, dtype=np.int64)
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y, classes=None):
+        """Cộng dồn các mẫu mới vào trọng tâm của lớp tương ứng (tạo lớp mới nếu cần)."""
+        X = self._normalize(X)
+        y = np.asarray(y, dtype=object)
+        if X.shape[0] != y.shape[0]:
+            raise ValueError(f"Số mẫu ({X.shape[0]}) không khớp số nhãn ({y.shape[0]})")
+        if self._sums is None:
+            self._sums = np.zeros((0, X.shape[1]), dtype=np.float64)
+        elif X.shape[1] != self._sums.shape[1]:
+            raise ValueError(f"Số chiều {X.shape[1]} khác mô hình {self._sums.shape[1]}")
+
+        known = set(self.classes_)
+        new_classes = [label for label in dict.fromkeys(y) if label not in known]
+        if new_classes:
+            self.classes_ = np.concatenate([self.classes_, np.asarray(new_classes, dtype=object)])
+            self._sums = np.vstack([self._sums, np.zeros((len(new_classes), X.shape[1]))])
+            self._counts = np.concatenate([self._counts, np.zeros(len(new_classes), np.int64)])
+
+        index = {label: i for i, label in enumerate(self.classes_)}
+        rows = np.fromiter((index[label] for label in y), dtype=np.intp, count=len(y))
+        for row in np.unique(rows):
+            members = rows == row
+            self._sums[row] += X[members].sum(axis=0, dtype=np.float64)
+            self._counts[row] += int(members.sum())
+        self._centroids = None
+        return self
+
+    @property
+    def centroids_(self):
+        if self._centroids is None:
+            self._centroids = self._normalize(self._sums)
+        return self._centroids
+
+    def decision_function(self, X):
+        """Độ tương đồng cosine (N, số lớp) giữa mẫu và từng trọng tâm."""
+        return self._normalize(X) @ self.centroids_.T
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X) / self.temperature
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, X):
+        return self.classes_[self.decision_function(X).argmax(axis=1)]
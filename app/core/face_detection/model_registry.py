@@ -0,0 +1,82 @@
+import hashlib
+import os
+import threading
+from core.face_detection.recognizer import FaceRecognizer
+
+
+def _file_signature(path):
+    """Chữ ký rẻ để phát hiện thay đổi: (mtime_ns, size)."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_digest(path, chunk_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class _CacheEntry:
+    __slots__ = ("signature", "digest", "value")
+
+    def __init__(self, signature, digest, value):
+        self.signature = signature
+        self.digest = digest
+        self.value = value
+
+
+class ModelRegistry:
+    """
+    Giữ mô hình và nhãn đã tải trong bộ nhớ, dùng chung giữa các lần rerun và các phiên.
+    - Chỉ tải lại khi mtime/size thay đổi và nội dung (sha256) thực sự khác.
+    - Đối tượng mới được dựng xong hoàn toàn rồi mới thay thế đối tượng cũ,
+      nên các lượt nhận diện đang chạy vẫn giữ mô hình cũ nguyên vẹn.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, path, loader):
+        signature = _file_signature(path)
+        entry = self._entries.get(key)
+        if entry is not None and entry.signature == signature:
+            return entry.value
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                return entry.value
+
+            digest = _file_digest(path)
+            if entry is not None and entry.digest == digest:
+                self._entries[key] = _CacheEntry(signature, digest, entry.value)
+                return entry.value
+
+            value = loader(path)
+            # Ghi chữ ký trước khi tải: nếu file bị thay trong lúc tải, lần gọi sau sẽ tải lại
+            self._entries[key] = _CacheEntry(signature, digest, value)
+            print(f"[GỠ LỖI] Registry đã tải lại {path}")
+            return value
+
+    def get_recognizer(self, path, model_type="svm"):
+        """Trả về FaceRecognizer đã cache cho file mô hình."""
+        return self._get(
+            ("model", path, model_type),
+            path,
+            lambda p: FaceRecognizer.load(p, model_type=model_type),
+        )
+
+    def invalidate(self, path=None):
+        """Xoá cache (toàn bộ hoặc của một file)."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[1] == path]:
+                    del self._entries[key]
+
+
+model_registry = ModelRegistry()
@@ -1,14 +1,26 @@
+import os
 import pickle
+import tempfile
 import numpy as np
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.svm import SVC
 from sklearn.neural_network import MLPClassifier
 from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier
 from sklearn.tree import DecisionTreeClassifier
+from sklearn.pipeline import make_pipeline
+from core.config import RECOGNITION_CONFIG
+from core.dataset_store import DATASET_DIR, DatasetStore
+from core.face_detection.gallery import NearestCentroidGallery
+from core.face_detection.reduction import FeatureReducer
 
 class FaceRecognizer:
-    def __init__(self, model_type="svm"):
-        """Khởi tạo lớp FaceRecognizer với loại mô hình được chỉ định."""
+    def __init__(self, model_type="svm", params=None, reduction=None):
+        """
+        Khởi tạo lớp FaceRecognizer với loại mô hình được chỉ định.
+        - params: siêu tham số ghi đè mặc định (vd. {"C": 10} cho svm).
+        - reduction: cấu hình giảm chiều {"method": "pca" | "pca_lda", "n_components", "whiten"}
+          đặt trước bộ phân loại; được lưu cùng mô hình trong một file.
+        """
         self.model_type = model_type
         if model_type == "knn":
             self.model = KNeighborsClassifier(n_neighbors=3)
@@ -18,24 +30,31 @@ class FaceRecognizer:
             self.model = MLPClassifier(hidden_layer_sizes=(100,), max_iter=500)
         elif model_type == "rf":
             self.model = RandomForestClassifier(n_estimators=100)
+        elif model_type == "centroid":
+            self.model = NearestCentroidGallery()
         elif model_type == "adaboost":
             base_estimator = DecisionTreeClassifier(max_depth=1)
             self.model = AdaBoostClassifier(
-                base_estimator=base_estimator, n_estimators=100, learning_rate=0.5
+                estimator=base_estimator, n_estimators=100, learning_rate=0.5
             )
         else:
             raise ValueError(f"Loại mô hình không được hỗ trợ: {model_type}")
+        if params:
+            self.model.set_params(**params)
+        if reduction and reduction.get("method"):
+            self.model = make_pipeline(FeatureReducer(**reduction), self.model)
 
         self.faces = None
         self.labels = None
         self.classes_ = None  # Lưu danh sách lớp sau khi huấn luyện
+        self.trained_rows = 0  # Số hàng đầu của tập dữ liệu mà mô hình đã học
+        self.thresholds = {}  # Ngưỡng confidence theo danh tính, hiệu chỉnh khi huấn luyện
 
-    def load_data(self, face_path, label_path):
-        """Tải dữ liệu khuôn mặt và nhãn từ file."""
-        with open(face_path, "rb") as f:
-            self.faces = pickle.load(f)
-        with open(label_path, "rb") as f:
-            self.labels = pickle.load(f)
+    def load_data(self, dataset_dir=DATASET_DIR):
+        """Tải đặc trưng (np.memmap, không sao chép) và nhãn từ tập dữ liệu."""
+        store = DatasetStore(dataset_dir)
+        self.faces = store.load(mmap=True)
+        self.labels = store.labels()
         print(f"[GỠ LỖI] Đã tải dữ liệu: hình dạng khuôn mặt={self.faces.shape}, độ dài nhãn={len(self.labels)}")
 
     def train(self):
@@ -51,29 +70,62 @@ class FaceRecognizer:
             self.classes_ = np.unique(self.labels)
         print(f"[GỠ LỖI] Classes sau huấn luyện: {self.classes_}")
 
+    @property
+    def supports_partial_fit(self):
+        """
+        Chỉ gallery trọng tâm học tăng dần được người mới. Các mô hình sklearn có
+        partial_fit khác (vd. MLPClassifier) cố định tập lớp từ lần fit đầu, nên phải
+        huấn luyện lại toàn bộ.
+        """
+        return isinstance(self.model, NearestCentroidGallery)
+
+    def partial_fit(self, faces, labels):
+        """Học thêm các mẫu mới mà không huấn luyện lại từ đầu (chỉ với mô hình hỗ trợ)."""
+        if not self.supports_partial_fit:
+            raise ValueError(f"Mô hình {self.model_type} không hỗ trợ học tăng dần")
+        print(f"[GỠ LỖI] Học thêm {len(labels)} mẫu")
+        self.model.partial_fit(faces, labels)
+        self.classes_ = self.model.classes_
+
+    def threshold(self, label):
+        """Ngưỡng chấp nhận của một danh tính (mặc định nếu chưa hiệu chỉnh)."""
+        return self.thresholds.get(label, RECOGNITION_CONFIG["default_threshold"])
+
+    def accept(self, label, confidence):
+        """Quyết định một lần: chấp nhận dự đoán nếu confidence đạt ngưỡng của danh tính đó."""
+        return confidence >= self.threshold(label)
+
     def predict(self, face):
         """Dự đoán nhãn cho một khuôn mặt."""
-        face = np.array(face).reshape(1, -1)  # Đảm bảo định dạng đúng
+        face = np.asarray(face, dtype=np.float32).reshape(1, -1)  # Đảm bảo định dạng đúng
         return self.model.predict(face)[0]
 
+    def predict_batch_with_confidence(self, faces):
+        """
+        Dự đoán nhãn và độ tin cậy cho nhiều khuôn mặt trong một lần gọi predict_proba.
+        - faces: Ma trận (N, số chiều HOG) hoặc danh sách vector.
+        - Trả về: (labels, confidences) dạng mảng NumPy độ dài N.
+        """
+        if self.classes_ is None:
+            raise ValueError("self.classes_ chưa được khởi tạo. Hãy huấn luyện hoặc tải mô hình trước.")
+
+        faces = np.asarray(faces, dtype=np.float32)
+        if faces.ndim == 1:
+            faces = faces.reshape(1, -1)
+        if faces.shape[0] == 0:
+            return np.empty(0, dtype=np.asarray(self.classes_).dtype), np.empty(0)
+
+        probas = self.model.predict_proba(faces)  # (N, số lớp)
+        max_indices = probas.argmax(axis=1)
+        confidences = probas[np.arange(len(max_indices)), max_indices]
+        labels = np.asarray(self.classes_)[max_indices]
+        return labels, confidences
+
     def predict_with_confidence(self, face):
         """Dự đoán nhãn với độ tin cậy."""
         try:
-            # Kiểm tra xem self.classes_ đã được khởi tạo chưa
-            if self.classes_ is None:
-                raise ValueError("self.classes_ chưa được khởi tạo. Hãy huấn luyện hoặc tải mô hình trước.")
-            
-            face = np.array(face).reshape(1, -1)  # Đảm bảo định dạng đúng
-            probas = self.model.predict_proba(face)[0]  # Lấy xác suất dự đoán
-            max_index = probas.argmax()  # Chỉ số của xác suất cao nhất
-            confidence = probas[max_index]  # Độ tin cậy
-            predicted_label = self.classes_[max_index]  # Nhãn dự đoán
-            
-            # In thông tin gỡ lỗi
-            print(f"[GỠ LỖI] Xác suất cho mỗi nhãn: {dict(zip(self.classes_, probas))}")
-            print(f"[GỠ LỖI] Nhãn dự đoán: {predicted_label}, độ tin cậy: {confidence}")
-            
-            return predicted_label, float(confidence)
+            labels, confidences = self.predict_batch_with_confidence(face)
+            return labels[0], float(confidences[0])
         except Exception as e:
             print(f"[LỖI] Lỗi trong predict_with_confidence: {e}")
             return None, 0.0
@@ -83,8 +135,28 @@ class FaceRecognizer:
         try:
             if self.classes_ is None:
                 raise ValueError("self.classes_ chưa được khởi tạo. Không thể lưu mô hình.")
-            with open(path, "wb") as f:
-                pickle.dump({'model': self.model, 'classes_': self.classes_}, f)  # Lưu từ điển
+            # Ghi ra file tạm rồi os.replace để bên đọc không bao giờ thấy file ghi dở
+            directory = os.path.dirname(path) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(
+                        {
+                            'model': self.model,
+                            'classes_': self.classes_,
+                            'model_type': self.model_type,
+                            'trained_rows': self.trained_rows,
+                            'thresholds': self.thresholds,
+                        },
+                        f,
+                    )  # Lưu từ điển
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
             print(f"[THÀNH CÔNG] Mô hình đã được lưu vào {path}")
         except Exception as e:
             print(f"[LỖI] Lỗi khi lưu mô hình: {e}")
@@ -101,6 +173,9 @@ class FaceRecognizer:
                     raise ValueError("Tệp mô hình không đúng định dạng: cần chứa 'model' và 'classes_'")
                 recognizer.model = data['model']
                 recognizer.classes_ = data['classes_']
+                recognizer.model_type = data.get('model_type', model_type)
+                recognizer.trained_rows = data.get('trained_rows', 0)
+                recognizer.thresholds = data.get('thresholds', {})
             print(f"[THÀNH CÔNG] Mô hình đã được tải từ {path}")
             print(f"[GỠ LỖI] Đã tải classes: {recognizer.classes_}")
             return recognizer
@@ -0,0 +1,43 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.decomposition import PCA
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+
+
+class FeatureReducer(BaseEstimator, TransformerMixin):
+    """
+    Giảm số chiều HOG trước bộ phân loại.
+    - "pca": PCA (whiten tuỳ chọn), "eigenfaces".
+    - "pca_lda": PCA rồi LDA xuống tối đa (số lớp - 1) chiều, "fisherfaces".
+    Số thành phần được giới hạn theo số mẫu/số lớp lúc fit, nên cùng cấu hình dùng
+    được cho cả tập dữ liệu nhỏ.
+    """
+
+    def __init__(self, method="pca", n_components=64, whiten=False):
+        self.method = method
+        self.n_components = n_components
+        self.whiten = whiten
+
+    def fit(self, X, y=None):
+        if self.method not in ("pca", "pca_lda"):
+            raise ValueError(f"Phương pháp giảm chiều không được hỗ trợ: {self.method}")
+        X = np.asarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        n_components = min(self.n_components, n_samples, n_features)
+        if self.method == "pca_lda":
+            n_classes = len(np.unique(y))
+            # Giữ ma trận phân tán trong lớp khả nghịch cho LDA
+            n_components = max(1, min(n_components, n_samples - n_classes))
+        self.pca_ = PCA(n_components=n_components, whiten=self.whiten, random_state=42).fit(X)
+        self.lda_ = None
+        self.n_features_out_ = n_components
+        if self.method == "pca_lda":
+            self.lda_ = LinearDiscriminantAnalysis().fit(self.pca_.transform(X), y)
+            self.n_features_out_ = min(n_classes - 1, n_components)
+        return self
+
+    def transform(self, X):
+        reduced = self.pca_.transform(np.asarray(X, dtype=np.float32))
+        if self.lda_ is not None:
+            reduced = self.lda_.transform(reduced)
+        return reduced.astype(np.float32, copy=False)
@@ -0,0 +1,160 @@
+import threading
+import cv2
+from core.config import TRACKING_CONFIG
+from core.face_detection.detector import detect_faces
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTrack:
+    """Một khuôn mặt được theo dõi qua nhiều khung hình, kèm phiếu bầu danh tính."""
+
+    __slots__ = ("track_id", "box", "template", "scale", "score", "votes")
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.template = None
+        self.scale = 1.0
+        self.score = 1.0  # Độ tin cậy theo dõi: 1.0 ngay sau khi phát hiện
+        self.votes = {}  # label -> [số phiếu, tổng confidence]
+
+    def identity(self):
+        """Trả về (label, confidence trung bình, số phiếu) của nhãn nhiều phiếu nhất."""
+        if not self.votes:
+            return None, 0.0, 0
+        label, (count, total) = max(self.votes.items(), key=lambda kv: (kv[1][0], kv[1][1]))
+        return label, total / count, count
+
+
+class FaceTracker:
+    """
+    Chỉ chạy Haar cascade mỗi `detect_interval` khung hình (hoặc khi theo dõi kém),
+    giữa các lần đó bám theo khuôn mặt bằng template matching trong vùng lân cận
+    ở độ phân giải thấp.
+    - update() phải được gọi tuần tự theo thứ tự khung hình (một luồng).
+    - vote()/identity() có thể gọi từ luồng khác.
+    """
+
+    def __init__(
+        self,
+        detect_interval=None,
+        min_track_score=None,
+        search_margin=None,
+        template_width=None,
+        min_iou=0.3,
+    ):
+        self.detect_interval = max(1, int(detect_interval or TRACKING_CONFIG["detect_interval"]))
+        self.min_track_score = (
+            TRACKING_CONFIG["min_track_score"] if min_track_score is None else min_track_score
+        )
+        self.search_margin = (
+            TRACKING_CONFIG["search_margin"] if search_margin is None else search_margin
+        )
+        self.template_width = template_width or TRACKING_CONFIG["template_width"]
+        self.min_iou = min_iou
+        self.tracks = {}
+        self.frames_seen = 0
+        self.detections_run = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _set_template(self, track, gray):
+        x, y, w, h = track.box
+        track.scale = min(1.0, self.template_width / float(max(w, 1)))
+        patch = gray[y:y + h, x:x + w]
+        if track.scale < 1.0:
+            patch = cv2.resize(patch, None, fx=track.scale, fy=track.scale, interpolation=cv2.INTER_AREA)
+        track.template = patch
+        track.score = 1.0
+
+    def _detect(self, gray):
+        self.detections_run += 1
+        boxes = [tuple(int(v) for v in box) for box in detect_faces(gray)]
+        # Ghép box mới với track cũ theo IoU để giữ phiếu bầu danh tính
+        unmatched = dict(self.tracks)
+        tracks = {}
+        for box in boxes:
+            best_id, best_iou = None, self.min_iou
+            for track_id, track in unmatched.items():
+                overlap = _iou(box, track.box)
+                if overlap >= best_iou:
+                    best_id, best_iou = track_id, overlap
+            if best_id is None:
+                track = FaceTrack(self._next_id, box)
+                self._next_id += 1
+            else:
+                track = unmatched.pop(best_id)
+                track.box = box
+            self._set_template(track, gray)
+            tracks[track.track_id] = track
+        with self._lock:
+            self.tracks = tracks
+
+    def _track(self, track, gray):
+        """Tìm lại khuôn mặt quanh vị trí cũ; cập nhật box và điểm theo dõi."""
+        x, y, w, h = track.box
+        frame_h, frame_w = gray.shape[:2]
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        window = gray[y0:y1, x0:x1]
+        if track.scale < 1.0:
+            window = cv2.resize(window, None, fx=track.scale, fy=track.scale, interpolation=cv2.INTER_AREA)
+        th, tw = track.template.shape[:2]
+        if window.shape[0] < th or window.shape[1] < tw:
+            track.score = 0.0
+            return
+        result = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (px, py) = cv2.minMaxLoc(result)
+        track.score = float(score)
+        track.box = (
+            x0 + int(round(px / track.scale)),
+            y0 + int(round(py / track.scale)),
+            w,
+            h,
+        )
+
+    def update(self, frame):
+        """
+        Cập nhật các track cho khung hình mới.
+        - Trả về: danh sách (track_id, (x, y, w, h)).
+        """
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        need_detect = not self.tracks or self.frames_seen % self.detect_interval == 0
+        if not need_detect:
+            for track in self.tracks.values():
+                self._track(track, gray)
+            need_detect = any(t.score < self.min_track_score for t in self.tracks.values())
+        if need_detect:
+            self._detect(gray)
+        self.frames_seen += 1
+        return [(track_id, track.box) for track_id, track in self.tracks.items()]
+
+    def vote(self, track_id, label, confidence):
+        """Ghi một phiếu nhận diện cho track; trả về identity() sau khi cập nhật."""
+        with self._lock:
+            track = self.tracks.get(track_id)
+            if track is None:
+                return label, float(confidence), 1
+            count_total = track.votes.setdefault(label, [0, 0.0])
+            count_total[0] += 1
+            count_total[1] += float(confidence)
+            return track.identity()
+
+    def best_identity(self):
+        """Track có nhiều phiếu nhất: (track_id, label, confidence, số phiếu) hoặc None."""
+        with self._lock:
+            candidates = [(t.identity(), t.track_id) for t in self.tracks.values() if t.votes]
+        if not candidates:
+            return None
+        (label, confidence, count), track_id = max(candidates, key=lambda c: (c[0][2], c[0][1]))
+        return track_id, label, confidence, count
@@ -0,0 +1,178 @@
+import queue
+import threading
+import time
+from core.config import PIPELINE_CONFIG
+
+_END = object()  # Tín hiệu kết thúc luồng dữ liệu giữa các stage
+
+
+class FrameResult:
+    """Một khung hình đi qua pipeline cùng kết quả của từng stage."""
+
+    __slots__ = ("index", "frame", "data", "timings", "error")
+
+    def __init__(self, index, frame):
+        self.index = index
+        self.frame = frame
+        self.data = {}  # Kết quả các stage: faces, features, labels, ...
+        self.timings = {}  # Thời gian xử lý (giây) theo tên stage
+        self.error = None
+
+
+class FramePipeline:
+    """
+    Pipeline đọc khung hình → các stage xử lý, mỗi stage chạy trên luồng riêng.
+    - Các stage nối với nhau bằng hàng đợi có giới hạn (backpressure).
+    - drop_frames=True (webcam trực tiếp): khi hàng đợi đầy thì bỏ khung hình cũ nhất
+      thay vì chặn việc đọc, để luôn xử lý khung hình mới.
+    - Người dùng duyệt kết quả trên luồng chính (nơi được phép gọi Streamlit).
+
+    stages: danh sách (name, func, workers). func(result) trả về result để chuyển tiếp,
+    hoặc None để bỏ khung hình. Lỗi trong stage được gán vào result.error và các
+    stage sau sẽ bỏ qua khung hình đó.
+    """
+
+    def __init__(self, cap, stages, queue_size=None, drop_frames=False, max_frames=None):
+        self.cap = cap
+        self.stages = [(name, func, max(1, int(workers))) for name, func, workers in stages]
+        self.queue_size = queue_size or PIPELINE_CONFIG["queue_size"]
+        self.drop_frames = drop_frames
+        self.max_frames = max_frames
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.exhausted = False  # True khi nguồn video hết khung hình
+        self._stop = threading.Event()
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        self._threads = []
+        self._remaining = [workers for _, _, workers in self.stages]
+        self._remaining_lock = threading.Lock()
+        self._started = False
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _put_latest(self, q, item):
+        """Đưa item vào hàng đợi, bỏ item cũ nhất nếu hàng đợi đầy."""
+        while not self._stop.is_set():
+            try:
+                q.put_nowait(item)
+                return True
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+        return False
+
+    def _decode(self):
+        out_q = self._queues[0]
+        try:
+            while not self._stop.is_set():
+                if self.max_frames is not None and self.frames_read >= self.max_frames:
+                    break
+                start = time.perf_counter()
+                ret, frame = self.cap.read()
+                if not ret:
+                    self.exhausted = True
+                    break
+                result = FrameResult(self.frames_read, frame)
+                result.timings["decode"] = time.perf_counter() - start
+                self.frames_read += 1
+                put = self._put_latest if self.drop_frames else self._put
+                if not put(out_q, result):
+                    break
+        except Exception as e:
+            print(f"[ERROR] Lỗi khi đọc khung hình trong pipeline: {e}")
+            self.exhausted = True
+        finally:
+            self._put(out_q, _END)
+
+    def _work(self, stage_index):
+        name, func, _ = self.stages[stage_index]
+        in_q = self._queues[stage_index]
+        out_q = self._queues[stage_index + 1]
+        while not self._stop.is_set():
+            try:
+                item = in_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                # Trả tín hiệu lại cho các worker khác cùng stage; worker cuối báo stage sau
+                with self._remaining_lock:
+                    self._remaining[stage_index] -= 1
+                    last = self._remaining[stage_index] == 0
+                if last:
+                    self._put(out_q, _END)
+                else:
+                    self._put(in_q, _END)
+                return
+            if item.error is None:
+                start = time.perf_counter()
+                try:
+                    item = func(item)
+                except Exception as e:
+                    print(f"[ERROR] Lỗi trong stage '{name}': {e}")
+                    item.error = e
+                if item is None:
+                    continue
+                item.timings[name] = time.perf_counter() - start
+            if not self._put(out_q, item):
+                return
+
+    def start(self):
+        if self._started:
+            return self
+        self._started = True
+        decoder = threading.Thread(target=self._decode, name="pipeline-decode", daemon=True)
+        self._threads.append(decoder)
+        for stage_index, (name, _, workers) in enumerate(self.stages):
+            for worker in range(workers):
+                self._threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(stage_index,),
+                        name=f"pipeline-{name}-{worker}",
+                        daemon=True,
+                    )
+                )
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __iter__(self):
+        self.start()
+        out_q = self._queues[-1]
+        while not self._stop.is_set():
+            try:
+                item = out_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def stop(self):
+        """Dừng mọi luồng và giải phóng các hàng đợi đang bị chặn."""
+        self._stop.set()
+        for q in self._queues:
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
@@ -0,0 +1,144 @@
+import cv2
+import numpy as np
+from core.config import SAMPLING_CONFIG
+
+STRATEGIES = ("all", "stride", "time", "scene", "auto")
+
+
+class SampledCapture:
+    """
+    Bọc cv2.VideoCapture để chỉ trả về một phần khung hình của video.
+    - "stride": 1 khung hình mỗi `stride` khung hình.
+    - "time": 1 khung hình mỗi `interval_sec` giây (dựa trên FPS của video).
+    - "scene": chỉ trả về khung hình khác đủ nhiều so với khung hình đã trả trước đó.
+    - "all": đọc tuần tự như cv2.VideoCapture.
+    Khung hình bị bỏ qua được nhảy bằng CAP_PROP_POS_FRAMES (bước lớn) hoặc grab()
+    (bước nhỏ, không cần retrieve/chuyển màu). Giao diện read/isOpened/get/set/release
+    giữ nguyên nên có thể truyền thẳng vào collect_face_data và FramePipeline.
+    """
+
+    def __init__(
+        self,
+        cap,
+        strategy="stride",
+        stride=None,
+        interval_sec=None,
+        scene_threshold=None,
+        seek_threshold=None,
+    ):
+        if strategy not in STRATEGIES or strategy == "auto":
+            raise ValueError(f"Chiến lược lấy mẫu không hợp lệ: {strategy}")
+        self.cap = cap
+        self.strategy = strategy
+        self.scene_threshold = (
+            SAMPLING_CONFIG["scene_threshold"] if scene_threshold is None else scene_threshold
+        )
+        self.seek_threshold = seek_threshold or SAMPLING_CONFIG["seek_threshold"]
+
+        if strategy == "time":
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0
+            interval = interval_sec or SAMPLING_CONFIG["interval_sec"]
+            self.step = max(1, int(round(interval * fps))) if fps > 0 else 1
+        elif strategy in ("stride", "scene"):
+            self.step = max(1, int(stride or SAMPLING_CONFIG["stride"]))
+        else:
+            self.step = 1
+
+        self.position = int(cap.get(cv2.CAP_PROP_POS_FRAMES) or 0)
+        self.frames_returned = 0
+        self.frames_decoded = 0  # Số khung hình thực sự được giải mã (retrieve)
+        self._last_signature = None
+
+    def _skip(self, count):
+        """Bỏ qua `count` khung hình; trả về False nếu hết video."""
+        if count <= 0:
+            return True
+        if count >= self.seek_threshold and self.cap.set(
+            cv2.CAP_PROP_POS_FRAMES, self.position + count
+        ):
+            self.position += count
+            return True
+        for _ in range(count):
+            if not self.cap.grab():
+                return False
+            self.position += 1
+        return True
+
+    def _read_one(self):
+        ret, frame = self.cap.read()
+        if ret:
+            self.position += 1
+            self.frames_decoded += 1
+        return ret, frame
+
+    @staticmethod
+    def _signature(frame):
+        """Ảnh xám thu nhỏ 16x16, dùng để so sánh cảnh (nhạy với thay đổi tư thế, vị trí)."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, (16, 16), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def read(self):
+        if self.frames_returned and not self._skip(self.step - 1):
+            return False, None
+
+        if self.strategy != "scene":
+            ret, frame = self._read_one()
+            if ret:
+                self.frames_returned += 1
+            return ret, frame
+
+        while True:
+            ret, frame = self._read_one()
+            if not ret:
+                return False, None
+            signature = self._signature(frame)
+            if (
+                self._last_signature is None
+                or np.mean(np.abs(signature - self._last_signature)) / 255.0
+                >= self.scene_threshold
+            ):
+                self._last_signature = signature
+                self.frames_returned += 1
+                return True, frame
+            if not self._skip(self.step - 1):
+                return False, None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        ok = self.cap.set(prop, value)
+        if ok and prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = int(value)
+            self.frames_returned = 0
+            self._last_signature = None
+        return ok
+
+    def release(self):
+        print(
+            f"[DEBUG] Frame sampler ({self.strategy}, bước={self.step}): "
+            f"trả về {self.frames_returned}, giải mã {self.frames_decoded} khung hình"
+        )
+        self.cap.release()
+
+
+def sample_capture(cap, strategy=None, target_frames=None, **kwargs):
+    """
+    Bọc `cap` bằng SampledCapture theo chiến lược đã chọn.
+    - strategy="auto": chọn bước stride để khoảng `target_frames` khung hình
+      được trải đều trên toàn bộ video; nguồn không biết độ dài (webcam) thì đọc hết.
+    - strategy="all": trả về nguyên `cap`.
+    """
+    strategy = strategy or SAMPLING_CONFIG["collect_strategy"]
+    if strategy == "auto":
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if frame_count <= 0 or not target_frames:
+            return cap
+        kwargs["stride"] = max(1, frame_count // int(target_frames))
+        strategy = "stride"
+    if strategy == "all":
+        return cap
+    return SampledCapture(cap, strategy=strategy, **kwargs)
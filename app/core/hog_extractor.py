@@ -0,0 +1,168 @@
+import threading
+import cv2
+import numpy as np
+from core.config import HOG_CONFIG
+
+
+class HOGExtractor:
+    """
+    Trích xuất HOG theo lô, cho kết quả khớp skimage.feature.hog
+    (orientations=9, block_norm="L2-Hys", transform_sqrt=False).
+    - Resize + cvtColor cho cả lô bằng bộ đệm dùng lại theo từng luồng.
+    - Gradient, histogram và chuẩn hoá block được vector hoá trên toàn lô.
+    - Kết quả float32 được ghi thẳng vào bộ đệm đầu ra do người gọi cấp (nếu có).
+    """
+
+    def __init__(self, config=HOG_CONFIG, orientations=9, min_roi_size=10):
+        self.image_size = tuple(config["image_size"])  # (width, height) như cv2.resize
+        self.cell_rows, self.cell_cols = config["pixels_per_cell"]
+        self.block_rows, self.block_cols = config["cells_per_block"]
+        self.orientations = orientations
+        self.min_roi_size = min_roi_size
+
+        width, height = self.image_size
+        self.n_cells_rows = height // self.cell_rows
+        self.n_cells_cols = width // self.cell_cols
+        self.n_blocks_rows = self.n_cells_rows - self.block_rows + 1
+        self.n_blocks_cols = self.n_cells_cols - self.block_cols + 1
+        self.feature_size = (
+            self.n_blocks_rows
+            * self.n_blocks_cols
+            * self.block_rows
+            * self.block_cols
+            * orientations
+        )
+        if "expected_hog_size" in config and config["expected_hog_size"] != self.feature_size:
+            raise ValueError(
+                f"HOG_CONFIG không nhất quán: {self.feature_size} != {config['expected_hog_size']}"
+            )
+
+        # Ngưỡng giữa các bin hướng, giống so sánh trong _hoghistogram của skimage
+        self._bin_edges = ((180.0 / orientations) * np.arange(1, orientations)).astype(np.float32)
+        # Chỉ số ô (cell) cho từng pixel trong vùng được phủ bởi các ô
+        rows = np.arange(self.n_cells_rows * self.cell_rows) // self.cell_rows
+        cols = np.arange(self.n_cells_cols * self.cell_cols) // self.cell_cols
+        self._cell_index = rows[:, None] * self.n_cells_cols + cols[None, :]
+        self._scratch = threading.local()
+
+    def _buffers(self, count):
+        """Bộ đệm BGR/xám dùng lại theo từng luồng, chỉ cấp phát lại khi lô lớn hơn."""
+        width, height = self.image_size
+        bgr = getattr(self._scratch, "bgr", None)
+        if bgr is None or bgr.shape[0] < count:
+            capacity = max(count, 8)
+            self._scratch.bgr = np.empty((capacity, height, width, 3), dtype=np.uint8)
+            self._scratch.gray = np.empty((capacity, height, width), dtype=np.uint8)
+        return self._scratch.bgr[:count], self._scratch.gray[:count]
+
+    def prepare(self, rois):
+        """
+        Resize các ROI (BGR hoặc xám) về image_size và chuyển sang ảnh xám.
+        - Trả về: (gray_batch (N, H, W) uint8, valid_mask (N,) bool).
+        """
+        count = len(rois)
+        bgr, gray = self._buffers(count)
+        valid = np.zeros(count, dtype=bool)
+        for i, roi in enumerate(rois):
+            if roi is None or roi.shape[0] < self.min_roi_size or roi.shape[1] < self.min_roi_size:
+                bgr[i] = 0
+                continue
+            if roi.ndim == 2:
+                roi = cv2.cvtColor(roi, cv2.COLOR_GRAY2BGR)
+            cv2.resize(roi, self.image_size, dst=bgr[i])
+            valid[i] = True
+        if count:
+            width, height = self.image_size
+            # Một lần cvtColor cho cả lô: ghép các ảnh theo chiều dọc
+            cv2.cvtColor(
+                bgr.reshape(count * height, width, 3),
+                cv2.COLOR_BGR2GRAY,
+                dst=gray.reshape(count * height, width),
+            )
+        return gray, valid
+
+    def compute(self, gray_batch, out=None):
+        """
+        Tính HOG cho lô ảnh xám đã đúng kích thước.
+        - gray_batch: (N, H, W) uint8.
+        - out: bộ đệm float32 (≥N, feature_size) để ghi kết quả (tuỳ chọn).
+        - Trả về: mảng float32 (N, feature_size).
+        """
+        gray_batch = np.asarray(gray_batch)
+        count = gray_batch.shape[0]
+        if out is None:
+            out = np.empty((count, self.feature_size), dtype=np.float32)
+        out = out[:count]
+        if count == 0:
+            return out
+
+        # Hiệu của hai giá trị uint8 biểu diễn chính xác trong float32, nên gradient giống
+        # skimage (float64); chỉ hypot/arctan2 sai khác ở mức làm tròn float32
+        image = gray_batch.astype(np.float32)
+        g_row = np.zeros_like(image)
+        g_col = np.zeros_like(image)
+        g_row[:, 1:-1, :] = image[:, 2:, :] - image[:, :-2, :]
+        g_col[:, :, 1:-1] = image[:, :, 2:] - image[:, :, :-2]
+
+        covered_rows = self.n_cells_rows * self.cell_rows
+        covered_cols = self.n_cells_cols * self.cell_cols
+        g_row = g_row[:, :covered_rows, :covered_cols]
+        g_col = g_col[:, :covered_rows, :covered_cols]
+
+        magnitude = np.hypot(g_col, g_row)
+        orientation = np.rad2deg(np.arctan2(g_row, g_col)) % 180
+        bins = np.digitize(orientation, self._bin_edges)
+        # Góc làm tròn đúng 180 không thuộc bin nào (skimage bỏ qua), đưa vào bin phụ
+        bins[orientation >= 180] = self.orientations
+
+        n_cells = self.n_cells_rows * self.n_cells_cols
+        slots = self.orientations + 1
+        index = (
+            np.arange(count)[:, None, None] * n_cells + self._cell_index[None]
+        ) * slots + bins
+        hist = np.bincount(
+            index.ravel(), weights=magnitude.ravel(), minlength=count * n_cells * slots
+        ).reshape(count, self.n_cells_rows, self.n_cells_cols, slots)[..., : self.orientations]
+        hist = hist.astype(np.float32)
+        hist /= self.cell_rows * self.cell_cols
+
+        return self.normalize_blocks(hist, out=out)
+
+    def normalize_blocks(self, hist, out=None, eps=1e-5):
+        """Gom histogram các ô thành block và chuẩn hoá L2-Hys như skimage."""
+        count = hist.shape[0]
+        if out is None:
+            out = np.empty((count, self.feature_size), dtype=np.float32)
+        blocks = np.lib.stride_tricks.sliding_window_view(
+            hist, (self.block_rows, self.block_cols), axis=(1, 2)
+        ).transpose(0, 1, 2, 4, 5, 3)
+        norm = np.sqrt(np.sum(blocks**2, axis=(3, 4, 5), keepdims=True) + eps**2)
+        normalized = np.minimum(blocks / norm, 0.2)
+        norm = np.sqrt(np.sum(normalized**2, axis=(3, 4, 5), keepdims=True) + eps**2)
+        np.divide(normalized, norm, out=out.reshape(normalized.shape), casting="same_kind")
+        return out
+
+    def extract(self, rois, out=None):
+        """
+        Resize + trích xuất HOG cho một lô ROI.
+        - Trả về: (features float32 (N, feature_size), valid_mask (N,) bool).
+          Hàng ứng với ROI không hợp lệ được đặt về 0.
+        """
+        gray, valid = self.prepare(rois)
+        features = self.compute(gray, out=out)
+        features[~valid] = 0
+        return features, valid
+
+
+_default_extractor = None
+_default_lock = threading.Lock()
+
+
+def get_hog_extractor():
+    """HOGExtractor dùng chung trong process, dựng từ HOG_CONFIG."""
+    global _default_extractor
+    if _default_extractor is None:
+        with _default_lock:
+            if _default_extractor is None:
+                _default_extractor = HOGExtractor(HOG_CONFIG)
+    return _default_extractor
@@ -0,0 +1,148 @@
+import os
+import pickle
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from core.config import TRAINING_CONFIG
+from core.face_detection.recognizer import FaceRecognizer
+
+
+def expand_candidates(candidates=None):
+    """Danh sách (model_type, params) từ lưới siêu tham số {model_type: {param: [giá trị]}}."""
+    candidates = candidates or TRAINING_CONFIG["search"]["candidates"]
+    return [
+        (model_type, params)
+        for model_type, grid in candidates.items()
+        for params in ParameterGrid(grid or {})
+    ]
+
+
+def _evaluate_candidate(model_type, params, X, y, folds, reduction=None):
+    """
+    Chạy trong worker của joblib: cross-validate một cấu hình, đo thời gian fit/predict
+    và kích thước mô hình khi pickle.
+    """
+    fold_accuracy, fit_seconds, predict_ms, model_bytes = [], [], [], []
+    try:
+        for train_index, test_index in folds:
+            model = FaceRecognizer(model_type=model_type, params=params, reduction=reduction).model
+            start = time.perf_counter()
+            model.fit(X[train_index], y[train_index])
+            fit_seconds.append(time.perf_counter() - start)
+
+            X_test = np.asarray(X[test_index])
+            start = time.perf_counter()
+            probas = model.predict_proba(X_test)
+            predict_ms.append((time.perf_counter() - start) * 1000 / len(test_index))
+            predictions = np.asarray(model.classes_)[probas.argmax(axis=1)]
+            fold_accuracy.append(accuracy_score(y[test_index], predictions))
+            model_bytes.append(len(pickle.dumps(model)))
+    except Exception as e:
+        return {
+            "model_type": model_type,
+            "params": params,
+            "reduction": reduction,
+            "pid": os.getpid(),
+            "error": str(e),
+        }
+    return {
+        "model_type": model_type,
+        "params": params,
+        "reduction": reduction,
+        "model_kb": float(np.mean(model_bytes)) / 1024,
+        "accuracy": float(np.mean(fold_accuracy)),
+        "accuracy_std": float(np.std(fold_accuracy)),
+        "fit_seconds": float(np.mean(fit_seconds)),
+        "predict_ms": float(np.mean(predict_ms)),  # Độ trễ dự đoán trung bình cho một khuôn mặt
+        "pid": os.getpid(),  # Worker đã chạy cấu hình này
+    }
+
+
+def objective(result, latency_weight=None):
+    """Điểm để xếp hạng: accuracy trừ latency_weight cho mỗi ms dự đoán một khuôn mặt."""
+    if "error" in result:
+        return float("-inf")
+    if latency_weight is None:
+        latency_weight = TRAINING_CONFIG["search"]["latency_weight"]
+    return result["accuracy"] - latency_weight * result["predict_ms"]
+
+
+def _make_folds(y, cv_folds):
+    _, class_counts = np.unique(y, return_counts=True)
+    cv_folds = max(2, min(cv_folds, int(class_counts.min())))
+    splitter = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+
+def select_model(
+    X, y, candidates=None, cv_folds=None, n_jobs=None, latency_weight=None, reduction=None
+):
+    """
+    Cross-validate các cấu hình ứng viên song song trên nhiều process (joblib/loky).
+    - X: ma trận đặc trưng (np.memmap được joblib chia sẻ cho worker, không sao chép).
+    - reduction: cấu hình giảm chiều (mặc định TRAINING_CONFIG["reduction"]).
+    - Trả về: (cấu hình tốt nhất, danh sách kết quả đã sắp theo objective giảm dần).
+    """
+    search = TRAINING_CONFIG["search"]
+    n_jobs = n_jobs or search["n_jobs"]
+    reduction = TRAINING_CONFIG["reduction"] if reduction is None else reduction
+    y = np.asarray(y)
+    folds = _make_folds(y, cv_folds or search["cv_folds"])
+    configs = expand_candidates(candidates)
+    print(f"[THÔNG TIN] Đánh giá {len(configs)} cấu hình với {len(folds)}-fold CV, n_jobs={n_jobs}")
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_candidate)(model_type, params, X, y, folds, reduction)
+        for model_type, params in configs
+    )
+    for result in results:
+        result["objective"] = objective(result, latency_weight)
+    results.sort(key=lambda r: r["objective"], reverse=True)
+
+    for result in results:
+        if "error" in result:
+            print(f"[CẢNH BÁO] {result['model_type']} {result['params']}: {result['error']}")
+        else:
+            print(
+                f"[GỠ LỖI] {result['model_type']} {result['params']}: "
+                f"acc={result['accuracy']:.3f}±{result['accuracy_std']:.3f}, "
+                f"fit={result['fit_seconds']:.2f}s, predict={result['predict_ms']:.3f}ms, "
+                f"model={result['model_kb']:.0f}KB"
+            )
+    best = results[0] if results and "error" not in results[0] else None
+    return best, results
+
+
+def benchmark_reduction(X, y, model_type="svm", params=None, reductions=None, cv_folds=None, n_jobs=None):
+    """
+    So sánh bộ phân loại trên HOG gốc với các cấu hình giảm chiều (cùng các fold CV).
+    - reductions: danh sách cấu hình; mặc định HOG gốc, PCA 64 chiều (có/không whiten)
+      và PCA+LDA.
+    - Trả về: danh sách kết quả (accuracy, fit_seconds, predict_ms, model_kb) theo cấu hình.
+    """
+    if reductions is None:
+        reductions = [
+            None,
+            {"method": "pca", "n_components": 64, "whiten": False},
+            {"method": "pca", "n_components": 64, "whiten": True},
+            {"method": "pca_lda", "n_components": 64, "whiten": False},
+        ]
+    y = np.asarray(y)
+    folds = _make_folds(y, cv_folds or TRAINING_CONFIG["search"]["cv_folds"])
+    results = Parallel(n_jobs=n_jobs or TRAINING_CONFIG["search"]["n_jobs"])(
+        delayed(_evaluate_candidate)(model_type, params or {}, X, y, folds, reduction)
+        for reduction in reductions
+    )
+    for result in results:
+        name = (result["reduction"] or {}).get("method") or "raw"
+        if "error" in result:
+            print(f"[CẢNH BÁO] {model_type}/{name}: {result['error']}")
+        else:
+            print(
+                f"[THÔNG TIN] {model_type}/{name}: acc={result['accuracy']:.3f}, "
+                f"fit={result['fit_seconds']:.3f}s, predict={result['predict_ms']:.3f}ms, "
+                f"model={result['model_kb']:.0f}KB"
+            )
+    return results
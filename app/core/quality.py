@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+from core.config import QUALITY_CONFIG
+
+
+def _box_sums(integral, x0, y0, x1, y1):
+    """Tổng trên các hình chữ nhật [y0:y1, x0:x1] từ ảnh tích phân, vector hoá theo box."""
+    return integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+
+
+def score_faces(frame, boxes, gray=None, config=QUALITY_CONFIG):
+    """
+    Chấm chất lượng mọi khuôn mặt trong một khung hình trong một lượt.
+    - frame: ảnh BGR (hoặc xám); gray: ảnh xám đã có sẵn (tuỳ chọn, tránh cvtColor lại).
+    - boxes: danh sách/mảng (x, y, w, h) theo toạ độ frame.
+    - Chỉ vùng bao các box được chuyển sang xám (một lần cho cả khung hình).
+    - Độ sáng và độ mất cân đối trái/phải lấy từ ảnh tích phân (int32) của vùng đó.
+    - Độ nét là phương sai Laplacian (uint8 -> int16) tính một lần trên vùng đó rồi
+      thống kê theo từng box bằng cv2.meanStdDev.
+    - Trả về: dict các mảng độ dài N: "brightness", "sharpness", "size" (cạnh ngắn, px),
+      "pose" (0 = hai nửa sáng như nhau, gần chính diện), "score" (càng cao càng tốt)
+      và "passed" (đạt ngưỡng độ sáng/độ nét/kích thước trong config). Ánh sáng lệch một
+      bên cũng làm tăng "pose", nên pose chỉ dùng để xếp hạng, không dùng để loại.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    count = len(boxes)
+    result = {
+        key: np.zeros(count, dtype=np.float64)
+        for key in ("brightness", "sharpness", "size", "pose", "score")
+    }
+    result["passed"] = np.zeros(count, dtype=bool)
+    if count == 0:
+        return result
+
+    height, width = (gray if gray is not None else frame).shape[:2]
+    x0 = np.maximum(boxes[:, 0], 0)
+    y0 = np.maximum(boxes[:, 1], 0)
+    x1 = np.minimum(boxes[:, 0] + boxes[:, 2], width)
+    y1 = np.minimum(boxes[:, 1] + boxes[:, 3], height)
+    size = np.minimum(x1 - x0, y1 - y0)
+    index = np.flatnonzero(size >= config["min_size"])
+    if len(index) == 0:
+        return result
+    x0, y0, x1, y1, size = x0[index], y0[index], x1[index], y1[index], size[index]
+
+    # Chỉ xử lý vùng bao các box hợp lệ (thêm 1 px viền cho Laplacian)
+    ux0, uy0 = max(int(x0.min()) - 1, 0), max(int(y0.min()) - 1, 0)
+    ux1, uy1 = min(int(x1.max()) + 1, width), min(int(y1.max()) + 1, height)
+    if gray is not None:
+        region = gray[uy0:uy1, ux0:ux1]
+    elif frame.ndim == 2:
+        region = frame[uy0:uy1, ux0:ux1]
+    else:
+        region = cv2.cvtColor(frame[uy0:uy1, ux0:ux1], cv2.COLOR_BGR2GRAY)
+    x0, x1, y0, y1 = x0 - ux0, x1 - ux0, y0 - uy0, y1 - uy0
+    xm = (x0 + x1) // 2
+
+    integral = cv2.integral(region)
+    left = _box_sums(integral, x0, y0, xm, y1)
+    right = _box_sums(integral, xm, y0, x1, y1)
+    rows = y1 - y0
+    brightness = (left + right) / (rows * (x1 - x0))
+    left_mean = left / (rows * (xm - x0))
+    right_mean = right / (rows * (x1 - xm))
+    pose = np.abs(left_mean - right_mean) / np.maximum(left_mean + right_mean, 1e-6)
+
+    laplacian = cv2.Laplacian(region, cv2.CV_16S)
+    sharpness = np.array([
+        cv2.meanStdDev(laplacian[b0:b1, a0:a1])[1][0, 0] ** 2
+        for a0, b0, a1, b1 in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())
+    ])
+
+    result["brightness"][index] = brightness
+    result["sharpness"][index] = sharpness
+    result["size"][index] = size
+    result["pose"][index] = pose
+    result["score"][index] = (
+        np.minimum(sharpness / config["sharpness_ref"], 1.0)
+        * np.minimum(size / config["size_ref"], 1.0)
+        * (1.0 - np.abs(brightness - 128.0) / 128.0)
+        * (1.0 - np.minimum(pose, 1.0))
+    )
+    result["passed"][index] = (
+        (brightness > config["min_brightness"])
+        & (sharpness > config["min_sharpness"])
+    )
+    return result
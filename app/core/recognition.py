@@ -0,0 +1,188 @@
+from core.config import PIPELINE_CONFIG, RECOGNITION_CONFIG, TRACKING_CONFIG
+from core.data_collector.face_data_collector import extract_hog_features_batch
+from core.face_detection.detector import detect_faces
+from core.face_detection.tracker import FaceTracker
+from core.frame_pipeline import FramePipeline
+
+
+def build_recognition_stages(recognizer, tracker=None):
+    """
+    Tạo các stage phát hiện → trích xuất HOG → phân loại cho FramePipeline.
+    Kết quả được ghi vào result.data: faces, track_ids, boxes, rois, names, confidences.
+    - tracker: FaceTracker (tuỳ chọn). Khi có, stage phát hiện chạy trên một luồng để
+      tracker thấy khung hình theo đúng thứ tự.
+    """
+
+    def detect_stage(result):
+        if tracker is None:
+            result.data["faces"] = detect_faces(result.frame)
+            result.data["track_ids"] = [None] * len(result.data["faces"])
+        else:
+            tracks = tracker.update(result.frame)
+            result.data["faces"] = [box for _, box in tracks]
+            result.data["track_ids"] = [track_id for track_id, _ in tracks]
+        return result
+
+    def extract_stage(result):
+        frame = result.frame
+        faces = result.data["faces"]
+        rois = [frame[y : y + h, x : x + w] for x, y, w, h in faces]
+        features, valid = extract_hog_features_batch(rois)
+        result.data["boxes"] = [tuple(box) for box, ok in zip(faces, valid) if ok]
+        result.data["track_ids"] = [t for t, ok in zip(result.data["track_ids"], valid) if ok]
+        result.data["rois"] = [roi for roi, ok in zip(rois, valid) if ok]
+        result.data["features"] = features[valid]
+        return result
+
+    def classify_stage(result):
+        features = result.data["features"]
+        if len(features):
+            # Mọi khuôn mặt trong khung hình được phân loại trong một lần gọi
+            names, confidences = recognizer.predict_batch_with_confidence(features)
+        else:
+            names, confidences = [], []
+        result.data["names"] = names
+        result.data["confidences"] = confidences
+        return result
+
+    detect_workers = 1 if tracker is not None else PIPELINE_CONFIG["detect_workers"]
+    return [
+        ("detect", detect_stage, detect_workers),
+        ("extract", extract_stage, PIPELINE_CONFIG["extract_workers"]),
+        ("classify", classify_stage, PIPELINE_CONFIG["classify_workers"]),
+    ]
+
+
+def recognize_stream(
+    cap, recognizer, decide, drop_frames=False, on_frame=None, on_face=None, min_frames=0
+):
+    """
+    Vòng nhận diện trên một nguồn video, không phụ thuộc Streamlit.
+    - Khi TRACKING_CONFIG bật: phát hiện thưa + theo dõi, mỗi track tích luỹ phiếu
+      danh tính và chỉ quyết định khi đủ min_votes phiếu (hoặc khi hết khung hình).
+    - Số phiếu cần không phụ thuộc ngưỡng: ngưỡng theo danh tính (recognizer.accept) chỉ
+      được decide dùng để chấp nhận hay từ chối kết quả bầu chọn.
+    - decide(name, confidence, roi) -> (recognized, message): gọi khi một khuôn mặt đủ phiếu.
+    - on_frame(result): gọi đầu mỗi khung hình; on_face(frame, box, name, confidence):
+      gọi cho mỗi khuôn mặt đã phân loại (vd. để hiển thị).
+    - min_frames: sau khi đã quyết định vẫn chạy tiếp pipeline (không quyết định lại) tới
+      khi xử lý đủ min_frames khung hình hoặc hết nguồn (math.inf), để đo thông lượng.
+    - Trả về: dict recognized, message, decision (name, confidence, votes) hoặc None,
+      frames (số khung hình đã xử lý), frames_to_decision, timings (list thời gian
+      theo stage của từng khung hình).
+    """
+    outcome = {
+        "recognized": False,
+        "message": "",
+        "decision": None,
+        "frames": 0,
+        "frames_to_decision": None,
+        "timings": [],
+    }
+    max_attempts = RECOGNITION_CONFIG["max_attempts"]
+    tracker = FaceTracker() if TRACKING_CONFIG["enabled"] else None
+    min_votes = TRACKING_CONFIG["min_votes"] if tracker is not None else 1
+    last_rois = {}  # track_id -> ROI gần nhất, dùng để lưu ảnh điểm danh
+
+    def make_decision(name, confidence, votes, roi):
+        outcome["decision"] = (name, confidence, votes)
+        outcome["frames_to_decision"] = outcome["frames"]
+        outcome["recognized"], outcome["message"] = decide(name, confidence, roi)
+        return outcome["recognized"]
+
+    deciding = True
+
+    def stop_deciding():
+        """Kết thúc giai đoạn quyết định; True nếu không cần xử lý thêm khung hình nào."""
+        nonlocal deciding
+        deciding = False
+        if not outcome["recognized"] and tracker is not None:
+            # Hết khung hình/lượt thử trước khi đủ phiếu: dùng track nhiều phiếu nhất
+            best = tracker.best_identity()
+            if best is not None:
+                track_id, name, confidence, votes = best
+                print(f"[GỠ LỖI] Quyết định với {votes} phiếu cho track {track_id}")
+                make_decision(name, confidence, votes, last_rois.get(track_id))
+        return outcome["frames"] >= min_frames
+
+    attempt = 0
+    stages = build_recognition_stages(recognizer, tracker)
+    with FramePipeline(cap, stages, drop_frames=drop_frames) as pipeline:
+        for result in pipeline:
+            outcome["frames"] += 1
+            outcome["timings"].append(dict(result.timings))
+            if on_frame is not None:
+                on_frame(result)
+            if not deciding:
+                if outcome["frames"] >= min_frames:
+                    break
+                continue
+
+            if result.error is not None:
+                print(f"[GỠ LỖI] Lỗi nhận diện: {result.error}")
+                outcome["message"] = f"❌ Lỗi nhận diện: {result.error}"
+                attempt += 1
+                if attempt >= max_attempts and stop_deciding():
+                    break
+                continue
+
+            faces = result.data["faces"]
+            print(f"[GỠ LỖI] Số lượng khuôn mặt được phát hiện: {len(faces)}")
+            if len(faces) == 0:
+                print("[GỠ LỖI] Không phát hiện khuôn mặt trong khung hình")
+                attempt += 1
+                if attempt >= max_attempts and stop_deciding():
+                    break
+                continue
+
+            boxes = result.data["boxes"]
+            if not boxes:
+                print("[GỠ LỖI] Không thể trích xuất HOG features")
+                attempt += 1
+                if attempt >= max_attempts and stop_deciding():
+                    break
+                continue
+
+            recognized = False
+            for box, track_id, roi, name, confidence in zip(
+                boxes,
+                result.data["track_ids"],
+                result.data["rois"],
+                result.data["names"],
+                result.data["confidences"],
+            ):
+                confidence = float(confidence)
+                votes = 1
+                if track_id is not None:
+                    # Nhãn hiển thị/quyết định là kết quả bầu chọn của cả track
+                    name, confidence, votes = tracker.vote(track_id, name, confidence)
+                    last_rois[track_id] = roi
+                if on_face is not None:
+                    on_face(result.frame, box, name, confidence)
+
+                if votes < min_votes:
+                    continue
+                recognized = make_decision(name, confidence, votes, roi)
+                if recognized:
+                    break
+
+            attempt += 1
+            if (recognized or attempt >= max_attempts) and stop_deciding():
+                break
+
+        if deciding:
+            stop_deciding()
+
+        if pipeline.exhausted and not outcome["recognized"] and attempt < max_attempts:
+            outcome["message"] = "❌ Không lấy được khung hình."
+            print("[GỠ LỖI] Không đọc được khung hình từ nguồn video")
+
+    if not outcome["recognized"] and not outcome["message"]:
+        outcome["message"] = (
+            "❌ Không nhận diện được khuôn mặt sau nhiều lần thử. Vui lòng thử lại."
+        )
+    if tracker is not None:
+        print(
+            f"[GỠ LỖI] Tracker: {tracker.detections_run} lần phát hiện / {tracker.frames_seen} khung hình"
+        )
+    return outcome
@@ -1,15 +1,16 @@
 import cv2
-import pickle
 import os
 import time
 import tempfile
 import streamlit as st
-from core.face_detection.detector import detect_faces
-from core.data_collector.face_data_collector import extract_hog_features
 from utils.helpers import append_attendance_log, is_action_allowed, has_trained_data, display_message
 from utils.user_utils import is_logged_in
 from core.data_collector.face_data_collector import is_good_quality
-from core.face_detection.recognizer import FaceRecognizer
+from core.face_detection.model_registry import model_registry
+from core.config import SAMPLING_CONFIG
+from core.dataset_store import DATASET_DIR, get_dataset_store
+from core.frame_sampler import sample_capture
+from core.recognition import recognize_stream
 
 def check_prerequisites(username, model_type="svm"):
     """
@@ -36,7 +37,7 @@ def check_prerequisites(username, model_type="svm"):
         return False, "❌ Mô hình chưa huấn luyện. Vui lòng liên hệ admin.", None
 
     try:
-        recognizer = FaceRecognizer.load(model_path, model_type=model_type)
+        recognizer = model_registry.get_recognizer(model_path, model_type=model_type)
         if not hasattr(recognizer, "predict_with_confidence"):
             print("[LỖI] recognizer không có phương thức predict_with_confidence")
             return (
@@ -55,17 +56,15 @@ def check_prerequisites(username, model_type="svm"):
 
 def load_labels():
     """
-    Tải nhãn từ names.pkl để debug.
-    - Trả về: labels (hoặc None nếu lỗi).
+    Tải số mẫu theo từng nhãn từ manifest của tập dữ liệu để debug (đã cache).
+    - Trả về: {label: số mẫu} (hoặc None nếu lỗi).
     """
-    names_path = "data/dataset/names.pkl"
     try:
-        with open(names_path, "rb") as f:
-            labels = pickle.load(f)
-        print(f"[GỠ LỖI] Đã tải nhãn: {labels}")
+        labels = get_dataset_store(DATASET_DIR).label_counts()
+        print(f"[GỠ LỖI] Đã tải {len(labels)} nhãn: {labels}")
         return labels
     except Exception as e:
-        print(f"[LỖI] Lỗi khi tải names.pkl: {e}")
+        print(f"[LỖI] Lỗi khi tải nhãn tập dữ liệu: {e}")
         return None
 
 def initialize_video_source(video_file):
@@ -90,7 +89,9 @@ def initialize_video_source(video_file):
         with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
             tmp.write(video_file.read())
             temp_file_path = tmp.name
-        cap = cv2.VideoCapture(temp_file_path)
+        cap = sample_capture(
+            cv2.VideoCapture(temp_file_path), SAMPLING_CONFIG["recognize_strategy"]
+        )
         if not cap.isOpened():
             return None, temp_file_path, "❌ Không thể đọc file video."
 
@@ -116,129 +117,79 @@ def process_frame_and_recognize(
 ):
     """
     Xử lý khung hình, nhận diện khuôn mặt, và lưu log điểm danh.
+    - Vòng nhận diện (bầu chọn theo track, ngưỡng theo danh tính) nằm ở
+      core.recognition.recognize_stream; hàm này lo phần hiển thị và ghi log.
     - Trả về: (recognized, result_message).
     """
-    recognized = False
-    result_message = ""
-    max_attempts = 10
     start_time = time.time()
 
-    try:
-        attempt = 0
-        while cap.isOpened() and not recognized and attempt < max_attempts:
-            ret, frame = cap.read()
-            if not ret:
-                result_message = "❌ Không lấy được khung hình."
+    def decide(name, confidence, roi):
+        """Quyết định điểm danh cho một khuôn mặt. Trả về (recognized, result_message)."""
+        label = name if name == username else "unknown"
+        if label == username:
+            if recognizer.accept(name, confidence):
+                if st.session_state.get("is_admin", False):
+                    print(f"[GỠ LỖI] Chế độ demo admin: {username}")
+                    return True, f"✅ [DEMO] Nhận diện: {username}"
+
+                is_allowed, check_msg = is_action_allowed(username, action)
+                if not is_allowed:
+                    print(f"[GỠ LỖI] is_action_allowed trả về False: {check_msg}")
+                    return True, check_msg
+
+                success, msg = append_attendance_log(username, roi, "attendance", action)
                 print(
-                    f"[GỠ LỖI] Không đọc được khung hình từ {'video' if video_file else 'webcam'}"
+                    f"[GỠ LỖI] Kết quả append_attendance_log: success={success}, message={msg}"
                 )
-                break
-
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            video_placeholder.image(
-                frame_rgb, caption="🔍 Đang nhận diện...", use_container_width=True
-            )
-
-            frame_start_time = time.time()
-            faces = detect_faces(frame)
-            print(f"[GỠ LỖI] Số lượng khuôn mặt được phát hiện: {len(faces)}")
-            if len(faces) == 0:
-                print("[GỠ LỖI] Không phát hiện khuôn mặt trong khung hình")
-                attempt += 1
-                continue
-
-            for x, y, w, h in faces:
-                roi = frame[y : y + h, x : x + w]
-                hog_features = extract_hog_features(roi, size=(100, 100))
-                if hog_features is None:
-                    print("[GỠ LỖI] Không thể trích xuất HOG features")
-                    attempt += 1
-                    continue
-
-                try:
-                    name, confidence = recognizer.predict_with_confidence(hog_features)
-                    print(
-                        f"[GỠ LỖI] Nhận diện: name={name}, confidence={confidence}, username={username}"
-                    )
-
-                    label = name if name == username else "unknown"
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    cv2.putText(
-                        frame,
-                        f"{label} ({confidence:.2f})",
-                        (x, y - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        (0, 255, 0),
-                        2,
-                    )
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    video_placeholder.image(
-                        frame_rgb,
-                        caption="🔍 Đang nhận diện...",
-                        use_container_width=True,
-                    )
-
-                    if label == username:
-                        if confidence >= 0.5:
-                            if st.session_state.get("is_admin", False):
-                                result_message = f"✅ [DEMO] Nhận diện: {username}"
-                                print(f"[GỠ LỖI] Chế độ demo admin: {username}")
-                                recognized = True
-                                break
+                return True, f"✅ {msg}" if success else f"❌ {msg}"
 
-                            is_allowed, check_msg = is_action_allowed(username, action)
-                            if not is_allowed:
-                                result_message = check_msg
-                                print(
-                                    f"[GỠ LỖI] is_action_allowed trả về False: {check_msg}"
-                                )
-                                recognized = True
-                                break
-                            else:
-                                success, msg = append_attendance_log(
-                                    username, roi, "attendance", action
-                                )
-                                result_message = f"✅ {msg}" if success else f"❌ {msg}"
-                                print(
-                                    f"[GỠ LỖI] Kết quả append_attendance_log: success={success}, message={msg}"
-                                )
-                                recognized = True
-                                break
-                        else:
-                            result_message = (
-                                "❌ Độ tin cậy thấp. Vui lòng check-in lại."
-                            )
-                            print(f"[GỠ LỖI] Confidence {confidence} dưới ngưỡng 0.5")
-                            recognized = True
-                            display_message(
-                                result_message,
-                                is_success=False,
-                                placeholder=video_placeholder,
-                            )
-                            break
-                    else:
-                        result_message = "❌ Khuôn mặt không xác định (unknown)"
-                        print(
-                            f"[GỠ LỖI] Bỏ qua khuôn mặt: label={label}, không khớp với username={username}"
-                        )
-                        recognized = True
-                        break
+            message = "❌ Độ tin cậy thấp. Vui lòng check-in lại."
+            print(f"[GỠ LỖI] Confidence {confidence} dưới ngưỡng {recognizer.threshold(name):.2f}")
+            display_message(message, is_success=False, placeholder=video_placeholder)
+            return True, message
 
-                except Exception as e:
-                    print(f"[GỠ LỖI] Lỗi nhận diện: {e}")
-                    result_message = f"❌ Lỗi nhận diện: {e}"
-                    attempt += 1
-                    continue
+        print(
+            f"[GỠ LỖI] Bỏ qua khuôn mặt: label={label}, không khớp với username={username}"
+        )
+        return True, "❌ Khuôn mặt không xác định (unknown)"
 
-            attempt += 1
+    def show(frame):
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        video_placeholder.image(
+            frame_rgb, caption="🔍 Đang nhận diện...", use_container_width=True
+        )
 
-        if not recognized and not result_message:
-            result_message = (
-                "❌ Không nhận diện được khuôn mặt sau nhiều lần thử. Vui lòng thử lại."
-            )
+    def on_face(frame, box, name, confidence):
+        print(
+            f"[GỠ LỖI] Nhận diện: name={name}, confidence={confidence}, username={username}"
+        )
+        x, y, w, h = box
+        label = name if name == username else "unknown"
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.putText(
+            frame,
+            f"{label} ({confidence:.2f})",
+            (x, y - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.7,
+            (0, 255, 0),
+            2,
+        )
+        show(frame)
 
+    try:
+        # Webcam trực tiếp: bỏ khung hình cũ khi xử lý không kịp
+        outcome = recognize_stream(
+            cap,
+            recognizer,
+            decide,
+            drop_frames=video_file is None,
+            on_frame=lambda result: show(result.frame),
+            on_face=on_face,
+        )
+        recognized, result_message = outcome["recognized"], outcome["message"]
     except Exception as e:
+        recognized = False
         result_message = f"❌ Lỗi trong quá trình nhận diện: {e}"
         print(f"[LỖI] Ngoại lệ trong process_frame_and_recognize: {e}")
 
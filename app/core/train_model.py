@@ -1,17 +1,51 @@
+import json
 import os
 import numpy as np
-import pickle
+from core.config import RECOGNITION_CONFIG, TRAINING_CONFIG
+from core.dataset_store import DATASET_DIR, DatasetStore
+from core.face_detection.calibration import calibrate_thresholds
 from core.face_detection.recognizer import FaceRecognizer
+from core.model_selection import select_model
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 
-def validate_data(face_path, label_path):
+def _no_progress(stage, metrics):
+    pass
+
+def save_selection_report(results, path=None):
+    """Ghi kết quả đánh giá từng ứng viên (accuracy, thời gian fit, độ trễ dự đoán) ra JSON."""
+    path = path or TRAINING_CONFIG["search"]["report_path"]
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2, default=str)
+        print(f"[GỠ LỖI] Đã ghi kết quả chọn mô hình vào {path}")
+    except Exception as e:
+        print(f"[CẢNH BÁO] Không ghi được {path}: {e}")
+
+def _format_thresholds(thresholds):
+    return ", ".join(f"{label}={value:.2f}" for label, value in sorted(thresholds.items()))
+
+def _split_for_calibration(labels, fraction):
+    """
+    Chia chỉ số các mẫu mới thành (học, hiệu chỉnh) theo từng nhãn.
+    Nhãn có quá ít mẫu (< 4) được học toàn bộ, không dùng để hiệu chỉnh.
+    """
+    rng = np.random.default_rng(42)
+    fit_index, holdout_index = [], []
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        n_holdout = int(len(members) * fraction) if len(members) >= 4 else 0
+        holdout_index.append(members[:n_holdout])
+        fit_index.append(members[n_holdout:])
+    return np.sort(np.concatenate(fit_index)), np.sort(np.concatenate(holdout_index))
+
+def validate_data(dataset_dir=DATASET_DIR):
     """Kiểm tra dữ liệu khuôn mặt và nhãn có khớp nhau không."""
     try:
-        with open(face_path, "rb") as f:
-            faces = pickle.load(f)
-        with open(label_path, "rb") as f:
-            labels = pickle.load(f)
+        store = DatasetStore(dataset_dir)
+        faces = store.load(mmap=True)
+        labels = store.labels()
 
         if len(faces) != len(labels):
             print(
@@ -25,6 +59,12 @@ def validate_data(face_path, label_path):
 
         unique_labels = set(labels)
         print(f"[THÔNG TIN] Tìm thấy {len(unique_labels)} nhãn: {unique_labels}")
+        missing = set(store.legacy_users()) - unique_labels
+        if missing:
+            print(
+                f"[CẢNH BÁO] {sorted(missing)} chỉ có trong names.pkl cũ, không còn đặc trưng: "
+                "mô hình huấn luyện lại sẽ không nhận diện được họ cho tới khi thu thập lại."
+            )
         if len(unique_labels) < 2:
             print(
                 f"[THÔNG TIN] Cần ≥2 nhãn để huấn luyện. Dữ liệu đã lưu, chờ thêm nhãn."
@@ -37,23 +77,51 @@ def validate_data(face_path, label_path):
 
 def train_model(
     model_type="svm",
-    face_path="data/dataset/faces.pkl",
-    label_path="data/dataset/names.pkl",
+    dataset_dir=DATASET_DIR,
     save_path="data/models/model.pkl",
+    progress=None,
 ):
-    """Huấn luyện mô hình và lưu vào file."""
+    """
+    Huấn luyện mô hình và lưu vào file.
+    - model_type="auto": chọn loại mô hình/siêu tham số bằng select_model() trước
+      (xem TRAINING_CONFIG["search"]), kết quả từng ứng viên ghi vào report_path.
+    - progress: callback(stage, metrics) để báo tiến độ (tuỳ chọn).
+    """
+    progress = progress or _no_progress
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
-    if not os.path.exists(face_path) or not os.path.exists(label_path):
+    if len(DatasetStore(dataset_dir)) == 0:
         print("[LỖI] Không tìm thấy dữ liệu khuôn mặt hoặc nhãn.")
         return False
 
-    if not validate_data(face_path, label_path):
+    progress("validate", {})
+    if not validate_data(dataset_dir):
         return False
 
     try:
-        recognizer = FaceRecognizer(model_type=model_type)
-        recognizer.load_data(face_path, label_path)
+        params = None
+        if model_type == "auto":
+            progress("search", {})
+            store = DatasetStore(dataset_dir)
+            best, results = select_model(store.load(mmap=True), store.labels())
+            save_selection_report(results)
+            if best is None:
+                print("[LỖI] Không có cấu hình ứng viên nào huấn luyện được.")
+                return False
+            model_type, params = best["model_type"], best["params"]
+            print(f"[THÔNG TIN] Chọn mô hình {model_type} {params} (objective={best['objective']:.3f})")
+            progress("search", {
+                "selected": f"{model_type} {params}",
+                "cv_accuracy": best["accuracy"],
+                "predict_ms": best["predict_ms"],
+                "search_workers": len({result["pid"] for result in results}),
+            })
+
+        recognizer = FaceRecognizer(
+            model_type=model_type, params=params, reduction=TRAINING_CONFIG["reduction"]
+        )
+        recognizer.load_data(dataset_dir)
+        progress("fit", {"samples": len(recognizer.labels)})
 
         X_train, X_test, y_train, y_test = train_test_split(
             recognizer.faces,
@@ -75,36 +143,49 @@ def train_model(
         recognizer.classes_ = recognizer.model.classes_
         print(f"[GỠ LỖI] Classes: {recognizer.classes_}")
 
+        progress("evaluate", {})
         train_predictions = recognizer.model.predict(X_train)
         train_accuracy = accuracy_score(y_train, train_predictions)
         print(f"[THÔNG TIN] Độ chính xác trên tập train: {train_accuracy:.2f}")
 
-        confidences = []
-        predictions = []
-        for x in X_test:
-            pred, conf = recognizer.predict_with_confidence(x)
-            predictions.append(pred)
-            confidences.append(conf)
+        probas = recognizer.model.predict_proba(np.asarray(X_test, dtype=np.float32))
+        predictions = np.asarray(recognizer.classes_)[probas.argmax(axis=1)]
+        confidences = probas.max(axis=1)
 
         test_accuracy = accuracy_score(y_test, predictions)
         mean_confidence = np.mean(confidences)
         print(f"[THÔNG TIN] Độ chính xác trên tập test: {test_accuracy:.2f}")
         print(f"[THÔNG TIN] Confidence trung bình trên tập test: {mean_confidence:.2f}")
-        print(
-            f"[THÔNG TIN] Gợi ý ngưỡng confidence: {max(0.5, float(mean_confidence) - 0.1):.2f}"
-        )
+
+        # Hiệu chỉnh ngưỡng trên tập test (mô hình chưa thấy); giữ nguyên sau khi fit lại
+        recognizer.thresholds = calibrate_thresholds(probas, recognizer.classes_, y_test)
+        print(f"[THÔNG TIN] Ngưỡng confidence theo danh tính: {_format_thresholds(recognizer.thresholds)}")
+
+        metrics = {
+            "train_accuracy": float(train_accuracy),
+            "test_accuracy": float(test_accuracy),
+            "mean_confidence": float(mean_confidence),
+            "thresholds": {str(k): round(v, 3) for k, v in recognizer.thresholds.items()},
+        }
+        progress("evaluate", metrics)
 
         if train_accuracy - test_accuracy > 0.15:
             print(
                 "[CẢNH BÁO] Mô hình có dấu hiệu overfitting (chênh lệch độ chính xác train/test > 0.15)"
             )
 
-        if test_accuracy < 0.9:
-            print("[LỖI] Độ chính xác trên tập test quá thấp. Không lưu mô hình.")
+        if test_accuracy < TRAINING_CONFIG["min_test_accuracy"]:
+            print(
+                f"[LỖI] Độ chính xác trên tập test quá thấp "
+                f"(< {TRAINING_CONFIG['min_test_accuracy']}). Không lưu mô hình."
+            )
             return False
 
+        progress("refit", metrics)
         recognizer.train()
+        recognizer.trained_rows = len(recognizer.labels)
 
+        progress("save", metrics)
         recognizer.save(save_path)
         print(
             f"[GỠ LỖI] Mô hình '{model_type}' đã được huấn luyện và lưu vào {save_path}"
@@ -112,4 +193,99 @@ def train_model(
         return True
     except Exception as e:
         print(f"[LỖI] Lỗi khi huấn luyện mô hình: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def update_model(
+    model_type=None,
+    dataset_dir=DATASET_DIR,
+    save_path="data/models/model.pkl",
+    progress=None,
+):
+    """
+    Cập nhật mô hình sau khi thu thập thêm dữ liệu.
+    - Gallery trọng tâm ("centroid"): chỉ học các hàng được ghi thêm kể từ lần huấn
+      luyện trước, chi phí tỉ lệ với số mẫu mới (xem FaceRecognizer.supports_partial_fit).
+      Một phần mẫu mới của mỗi nhãn được giữ lại, cùng một phần mẫu cũ, để hiệu chỉnh
+      lại ngưỡng của mọi nhãn (xem calibrate_thresholds) trước khi được học nốt.
+    - Mô hình khác, hoặc tập dữ liệu không còn khớp mô hình đã lưu: huấn luyện lại toàn bộ
+      bằng train_model().
+    - progress: callback(stage, metrics) để báo tiến độ (tuỳ chọn).
+    """
+    progress = progress or _no_progress
+    model_type = model_type or TRAINING_CONFIG["model_type"]
+    if model_type == "auto" or TRAINING_CONFIG["reduction"].get("method"):
+        # Chọn mô hình và giảm chiều luôn cần fit lại trên toàn bộ dữ liệu
+        return train_model(
+            model_type=model_type,
+            dataset_dir=dataset_dir,
+            save_path=save_path,
+            progress=progress,
+        )
+    store = DatasetStore(dataset_dir)
+    total = len(store)
+
+    recognizer = None
+    if os.path.exists(save_path):
+        try:
+            recognizer = FaceRecognizer.load(save_path, model_type=model_type)
+        except Exception as e:
+            print(f"[CẢNH BÁO] Không tải được mô hình cũ, huấn luyện lại: {e}")
+    if recognizer is not None and (
+        recognizer.model_type != model_type
+        or not recognizer.supports_partial_fit
+        or recognizer.trained_rows > total
+    ):
+        recognizer = None
+    if recognizer is None:
+        recognizer = FaceRecognizer(model_type=model_type)
+        if not recognizer.supports_partial_fit:
+            return train_model(
+                model_type=model_type,
+                dataset_dir=dataset_dir,
+                save_path=save_path,
+                progress=progress,
+            )
+
+    start = recognizer.trained_rows
+    if start == total:
+        print("[THÔNG TIN] Không có dữ liệu mới, giữ nguyên mô hình.")
+        return True
+    try:
+        progress("fit", {"samples": total - start})
+        all_faces, all_labels = store.load(mmap=True), np.asarray(store.labels())
+        faces, labels = np.asarray(all_faces[start:total]), all_labels[start:total]
+        fit_index, holdout_index = _split_for_calibration(
+            labels, RECOGNITION_CONFIG["calibration_split"]
+        )
+        recognizer.partial_fit(faces[fit_index], labels[fit_index])
+        if len(recognizer.classes_) < 2:
+            print("[THÔNG TIN] Cần ≥2 nhãn để nhận diện. Dữ liệu đã lưu, chờ thêm nhãn.")
+            return False
+        # Người lạ mô phỏng cho mọi danh tính: mẫu giữ lại của người mới cùng một phần
+        # mẫu cũ (bỏ lớp thật của mẫu nên việc gallery đã học chúng không ảnh hưởng)
+        old_index = np.sort(
+            np.random.default_rng(total).permutation(start)[: RECOGNITION_CONFIG["calibration_rows"]]
+        )
+        calibration_faces = np.concatenate([faces[holdout_index], all_faces[old_index]])
+        calibration_labels = np.concatenate([labels[holdout_index], all_labels[old_index]])
+        progress("calibrate", {"samples": len(calibration_labels)})
+        probas = recognizer.model.predict_proba(calibration_faces)
+        thresholds = calibrate_thresholds(probas, recognizer.classes_, calibration_labels)
+        # Thêm người làm thay đổi xác suất của mọi lớp nên ngưỡng của các lớp cũ cũng được tính lại
+        recognizer.thresholds = {**recognizer.thresholds, **thresholds}
+        print(f"[THÔNG TIN] Ngưỡng confidence theo danh tính: {_format_thresholds(thresholds)}")
+        if len(holdout_index):
+            recognizer.partial_fit(faces[holdout_index], labels[holdout_index])
+        recognizer.trained_rows = total
+        progress("save", {"samples": total - start, "classes": len(recognizer.classes_)})
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        recognizer.save(save_path)
+        print(
+            f"[GỠ LỖI] Mô hình '{model_type}' đã học thêm {total - start} mẫu "
+            f"({len(recognizer.classes_)} nhãn) và lưu vào {save_path}"
+        )
+        return True
+    except Exception as e:
+        print(f"[LỖI] Lỗi khi cập nhật mô hình: {e}")
+        return False
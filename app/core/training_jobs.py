@@ -0,0 +1,174 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from core.dataset_store import DATASET_DIR
+
+STATUS_PATH = "data/models/training_status.json"
+MODEL_PATH = "data/models/model.pkl"
+
+
+def _write_json_atomic(path, data):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".status-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_training_status(status_path=STATUS_PATH):
+    """Trạng thái lần huấn luyện gần nhất (dict rỗng nếu chưa từng chạy)."""
+    try:
+        with open(status_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _run_job(job_id, model_type, dataset_dir, save_path, status_path):
+    """Chạy trong process con: huấn luyện và ghi tiến độ/kết quả vào file trạng thái."""
+    from core.dataset_store import DatasetStore
+    from core.train_model import update_model
+
+    status = {
+        "job_id": job_id,
+        "state": "running",
+        "stage": "start",
+        "model_type": model_type,
+        "pid": os.getpid(),
+        "dataset_version": DatasetStore(dataset_dir).version(),
+        "started_at": time.time(),
+        "metrics": {},
+    }
+    _write_json_atomic(status_path, status)
+
+    def progress(stage, metrics):
+        status["stage"] = stage
+        status["metrics"].update(metrics)
+        _write_json_atomic(status_path, status)
+
+    try:
+        success = update_model(
+            model_type=model_type,
+            dataset_dir=dataset_dir,
+            save_path=save_path,
+            progress=progress,
+        )
+        status["state"] = "done" if success else "failed"
+    except Exception as e:
+        print(f"[LỖI] Lỗi trong tiến trình huấn luyện: {e}")
+        status["state"] = "failed"
+        status["error"] = str(e)
+    finally:
+        # Worker loky của select_model chờ việc tới khi hết idle timeout; tắt chúng để
+        # process con (không phải daemon) kết thúc ngay khi huấn luyện xong
+        from joblib.externals.loky import get_reusable_executor
+
+        get_reusable_executor().shutdown(wait=True)
+    status["finished_at"] = time.time()
+    _write_json_atomic(status_path, status)
+
+
+class TrainingJobManager:
+    """
+    Chạy huấn luyện trong process riêng để không chặn phiên Streamlit.
+    - Tại mỗi thời điểm chỉ có một job; yêu cầu đến khi đang chạy được gộp thành
+      đúng một lần chạy tiếp theo (job sau sẽ học cả dữ liệu mới của các yêu cầu đó).
+    - Process con ghi tiến độ và chỉ số vào file trạng thái JSON; mô hình được lưu
+      nguyên tử (os.replace) nên model_registry tự tải lại mà không cần khởi động lại.
+    - Process con không phải daemon để joblib/loky tạo được worker cho model_type="auto"
+      (loky tự lùi về n_jobs=1 trong process daemon); luồng _watch join nó khi kết thúc.
+    """
+
+    def __init__(self, dataset_dir=DATASET_DIR, save_path=MODEL_PATH, status_path=STATUS_PATH):
+        self.dataset_dir = dataset_dir
+        self.save_path = save_path
+        self.status_path = status_path
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._process = None
+        self._pending = None  # model_type của lần chạy đã gộp, None nếu không có
+        self._job_counter = 0
+
+    def _start_locked(self, model_type):
+        self._job_counter += 1
+        job_id = f"{int(time.time())}-{self._job_counter}"
+        _write_json_atomic(
+            self.status_path,
+            {"job_id": job_id, "state": "queued", "model_type": model_type, "metrics": {}},
+        )
+        process = self._context.Process(
+            target=_run_job,
+            args=(job_id, model_type, self.dataset_dir, self.save_path, self.status_path),
+            name=f"training-{job_id}",
+            daemon=False,
+        )
+        process.start()
+        self._process = process
+        threading.Thread(
+            target=self._watch, args=(process,), name=f"training-watch-{job_id}", daemon=True
+        ).start()
+        print(f"[THÔNG TIN] Đã bắt đầu job huấn luyện {job_id} (pid {process.pid})")
+        return job_id
+
+    def _watch(self, process):
+        process.join()
+        with self._lock:
+            if self._process is process:
+                self._process = None
+            if process.exitcode not in (0, None):
+                status = read_training_status(self.status_path)
+                if status.get("state") in ("queued", "running"):
+                    status.update(state="failed", error=f"exit code {process.exitcode}")
+                    _write_json_atomic(self.status_path, status)
+            if self._pending is not None and self._process is None:
+                model_type, self._pending = self._pending, None
+                self._start_locked(model_type)
+
+    def is_running(self):
+        with self._lock:
+            return self._process is not None and self._process.is_alive()
+
+    def submit(self, model_type=None):
+        """
+        Yêu cầu huấn luyện lại.
+        - Trả về: "started" nếu job mới được chạy ngay, "queued" nếu đã gộp vào sau job hiện tại.
+        """
+        from core.config import TRAINING_CONFIG
+
+        model_type = model_type or TRAINING_CONFIG["model_type"]
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                self._pending = model_type
+                print("[THÔNG TIN] Đang huấn luyện, yêu cầu mới được gộp vào lần chạy tiếp theo")
+                return "queued"
+            self._start_locked(model_type)
+            return "started"
+
+    def status(self):
+        """Trạng thái hiện tại, kèm cờ pending nếu có lần chạy đang chờ."""
+        status = read_training_status(self.status_path)
+        with self._lock:
+            status["pending"] = self._pending is not None
+        return status
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_training_manager():
+    """TrainingJobManager dùng chung trong process Streamlit."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TrainingJobManager()
+        return _manager
@@ -1,13 +1,49 @@
-import pickle
 import streamlit as st
 import requests
 import os
-from core.train_model import train_model
+from core.dataset_store import DATASET_DIR, get_dataset_store
+from core.training_jobs import get_training_manager
 from core.data_collector.webcam_data_collector import collect_data_from_webcam
 from core.data_collector.video_data_collector import collect_data_from_uploaded_video
 from utils.auth import logout, load_users, save_users
 from utils.user_utils import is_admin, is_logged_in
-from utils.helpers import read_attendance_csv, preprocess_attendance, save_uploaded_video, read_all_attendance_csv
+from utils.attendance_store import ATTENDANCE_COLUMNS
+from utils.helpers import (
+    preprocess_attendance,
+    save_uploaded_video,
+    read_all_attendance_csv,
+    query_attendance,
+    query_attendance_page,
+    count_attendance,
+    delete_attendance_records,
+)
+
+_STATE_LABELS = {
+    "queued": "⏳ Đang chờ",
+    "running": "⚙️ Đang huấn luyện",
+    "done": "✅ Hoàn tất",
+    "failed": "❌ Thất bại",
+}
+
+
+@st.fragment(run_every=2)
+def training_status_panel():
+    """Trạng thái job huấn luyện nền, tự làm mới mà không chạy lại cả trang."""
+    status = get_training_manager().status()
+    if not status.get("state"):
+        return
+    text = f"Huấn luyện mô hình ({status.get('model_type', '')}): {_STATE_LABELS.get(status['state'], status['state'])}"
+    if status["state"] == "running":
+        text += f" — bước: {status.get('stage', '')}"
+    if status.get("pending"):
+        text += " — còn một lần huấn luyện đang chờ"
+    st.caption(text)
+    metrics = {k: round(v, 3) if isinstance(v, float) else v for k, v in status.get("metrics", {}).items()}
+    if metrics and status["state"] in ("done", "failed"):
+        st.caption(f"Chỉ số: {metrics}")
+    if status.get("error"):
+        st.caption(f"Lỗi: {status['error']}")
+
 
 def main():
     # Sidebar
@@ -133,24 +169,23 @@ def main():
                     os.remove(saved_video_path)
 
                 if success:
-                    label_path = "data/dataset/names.pkl"
-                    with open(label_path, "rb") as f:
-                        labels = pickle.load(f)
-                    if len(set(labels)) < 2:
+                    # Chỉ đếm người có đặc trưng: người chỉ có trong names.pkl cũ không huấn luyện được
+                    labels = get_dataset_store(DATASET_DIR).feature_label_counts()
+                    if len(labels) < 2:
                         st.warning(
-                            f"Chỉ có {len(set(labels))} nhãn ({set(labels)}). Cần ≥2 nhãn để huấn luyện. Dữ liệu đã lưu, vui lòng thu thập thêm."
+                            f"Chỉ có {len(labels)} nhãn ({labels}). Cần ≥2 nhãn để huấn luyện. Dữ liệu đã lưu, vui lòng thu thập thêm."
                         )
                     else:
-                        success_train = train_model(
-                            face_path="data/dataset/faces.pkl",
-                            label_path="data/dataset/names.pkl",
-                            save_path="data/models/model.pkl",
-                            model_type="svm",
-                        )
-                        if success_train:
-                            st.success(f"Đã thu thập và huấn luyện xong cho: {name}")
+                        # Huấn luyện trong process nền, admin có thể tiếp tục thu thập
+                        if get_training_manager().submit() == "started":
+                            st.success(
+                                f"Đã thu thập dữ liệu cho: {name}. Đang huấn luyện mô hình ở nền."
+                            )
                         else:
-                            st.error("Lỗi khi huấn luyện mô hình.")
+                            st.info(
+                                f"Đã thu thập dữ liệu cho: {name}. Mô hình sẽ được huấn luyện "
+                                "lại ngay sau lần huấn luyện hiện tại."
+                            )
                 else:
                     st.error(
                         "Không thu thập được dữ liệu. Vui lòng kiểm tra video/webcam/URL."
@@ -158,50 +193,68 @@ def main():
             except Exception as e:
                 st.error(f"Lỗi khi thu thập hoặc huấn luyện: {e}")
 
+    training_status_panel()
+
     # Hiển thị bảng điểm danh
     st.subheader("Bảng điểm danh")
+    # Đọc bảng gộp một lần cho mỗi lần rerun
+    raw_df, user_files = read_all_attendance_csv()
+    filter_col1, filter_col2 = st.columns([2, 3])
+    user_filter = filter_col1.selectbox(
+        "Lọc theo nhân viên", ["Tất cả"] + sorted(user_files)
+    )
+    date_range = filter_col2.date_input("Lọc theo khoảng ngày", value=())
+    filter_username = None if user_filter == "Tất cả" else user_filter
+    start_date, end_date = date_range if len(date_range) == 2 else (None, None)
     try:
-        data, _ = read_all_attendance_csv()
+        if filter_username or start_date:
+            data = query_attendance(
+                username=filter_username, start_date=start_date, end_date=end_date
+            )
+        else:
+            data = raw_df
         summary_df = preprocess_attendance(data)
         st.dataframe(summary_df, use_container_width=True)
     except Exception as e:
         st.error(f"Lỗi khi đọc dữ liệu điểm danh: {e}")
 
-    # Xóa dòng điểm danh
+    # Xóa dòng điểm danh (theo trang, dùng chung bộ lọc với bảng trên)
     with st.expander("Quản lý & xoá dữ liệu điểm danh"):
         try:
-            raw_df, user_files = read_all_attendance_csv()
-            if raw_df.empty:
+            page_size = 50
+            total = count_attendance(filter_username, start_date, end_date)
+            if total == 0:
                 st.info("Không có dòng nào để xoá.")
             else:
-                st.markdown("### Chọn dòng để xoá")
-                raw_df = raw_df.reset_index(drop=True)
-                for idx, row in raw_df.iterrows():
-                    col1, col2, col3 = st.columns([4, 4, 1])
-                    col1.write(f"{row.get('name', '')}")
-                    col2.write(f"{row.get('date', '')}")
-                    if col3.button("Xoá", key=f"del_row_{idx}"):
-                        username = row.get("username")
-                        if username in user_files:
-                            user_df = read_attendance_csv(username=username)
-                            mask = (
-                                (user_df["name"] == row.get("name"))
-                                & (user_df["date"] == row.get("date"))
-                                & (user_df["time-check-in"] == row.get("time-check-in"))
-                            )
-                            if mask.any():
-                                user_df = user_df[~mask].reset_index(drop=True)
-                                user_df.to_csv(user_files[username], index=False)
-                                st.success(
-                                    f"Đã xoá dòng: {row.get('name', '')} - {row.get('date', '')}"
-                                )
-                                st.rerun()
-                            else:
-                                st.error(
-                                    f"Không tìm thấy bản ghi tương ứng cho {username}"
-                                )
-                        else:
-                            st.error(f"Không tìm thấy tệp điểm danh cho {username}")
+                total_pages = (total + page_size - 1) // page_size
+                page = st.number_input(
+                    f"Trang (tổng {total} dòng, {total_pages} trang)",
+                    min_value=1,
+                    max_value=total_pages,
+                    value=1,
+                    step=1,
+                )
+                page_df = query_attendance_page(
+                    filter_username, start_date, end_date, page=page, page_size=page_size
+                )
+                page_df.insert(0, "Chọn", False)
+                edited = st.data_editor(
+                    page_df[["Chọn", "id", "username"] + ATTENDANCE_COLUMNS],
+                    hide_index=True,
+                    use_container_width=True,
+                    disabled=["id", "username"] + ATTENDANCE_COLUMNS,
+                    key=f"attendance_editor_{filter_username}_{start_date}_{end_date}_{page}",
+                )
+                selected_ids = edited.loc[edited["Chọn"], "id"].tolist()
+                if st.button(
+                    f"Xoá {len(selected_ids)} dòng đã chọn", disabled=not selected_ids
+                ):
+                    deleted = delete_attendance_records(selected_ids)
+                    if deleted:
+                        st.success(f"Đã xoá {deleted} dòng điểm danh.")
+                        st.rerun()
+                    else:
+                        st.error("Không tìm thấy bản ghi tương ứng để xoá.")
         except Exception as e:
             st.error(f"Lỗi khi xử lý xoá: {e}")
 
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Ứng dụng chạy từ app/ với import dạng "core."/"utils."
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,44 @@
+import sqlite3
+import threading
+from utils.attendance_store import AttendanceStore
+
+DATE = "2024-05-06"
+
+
+def _in_new_thread(func):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=func()))
+    thread.start()
+    thread.join()
+    return result["value"]
+
+
+def test_status_sees_write_from_other_connection(tmp_path):
+    store = AttendanceStore(str(tmp_path / "attendance.db"), str(tmp_path / "logs"))
+    assert store.day_status("pele", DATE) == (False, False)  # Ngày được nạp vào chỉ mục
+
+    # Process khác check-in trực tiếp vào CSDL
+    other = sqlite3.connect(store.db_path, isolation_level=None)
+    other.execute(
+        "INSERT INTO attendance (username, name, date, time_check_in, position) "
+        "VALUES ('pele', 'Pele', ?, ?, 'dev')",
+        (DATE, f"{DATE} 08:00:00"),
+    )
+    other.close()
+
+    # Mỗi lần rerun Streamlit chạy trên một luồng mới
+    assert _in_new_thread(lambda: store.day_status("pele", DATE)) == (True, False)
+    success, _ = _in_new_thread(lambda: store.check_out("pele", DATE, f"{DATE} 17:00:00"))
+    assert success
+    assert store.day_status("pele", DATE) == (True, True)
+
+
+def test_own_writes_update_cached_day(tmp_path):
+    store = AttendanceStore(str(tmp_path / "attendance.db"), str(tmp_path / "logs"))
+    assert store.day_status("mbappe", DATE) == (False, False)
+
+    assert store.check_in("mbappe", "Mbappe", DATE, f"{DATE} 08:00:00", "dev")[0]
+    revision, day = store.status_index._days[DATE]
+    assert revision == store.revision()
+    assert day["mbappe"][0] == f"{DATE} 08:00:00"
+    assert store.day_status("mbappe", DATE) == (True, False)
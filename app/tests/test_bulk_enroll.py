@@ -0,0 +1,32 @@
+import os
+from core.bulk_enroll import discover_videos, name_from_filename, read_manifest
+
+
+def test_name_from_filename_strips_trailing_numbers():
+    assert name_from_filename("pele2.mp4") == "pele"
+    assert name_from_filename("videos/ronaldo_12.avi") == "ronaldo"
+    assert name_from_filename("van dijk - 3.mov") == "van dijk"
+    assert name_from_filename("2024.mp4") == "2024"
+
+
+def test_discover_videos_reads_files_and_person_folders(tmp_path):
+    for path in ("pele2.mp4", "notes.txt", "messi/a.mp4", "messi/b.MOV", "messi/readme.md"):
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_bytes(b"")
+
+    assert discover_videos(str(tmp_path)) == [
+        (os.path.join(str(tmp_path), "messi", "a.mp4"), "messi"),
+        (os.path.join(str(tmp_path), "messi", "b.MOV"), "messi"),
+        (os.path.join(str(tmp_path), "pele2.mp4"), "pele"),
+    ]
+
+
+def test_read_manifest_resolves_paths_relative_to_csv(tmp_path):
+    manifest = tmp_path / "lists" / "videos.csv"
+    manifest.parent.mkdir()
+    manifest.write_text("video,name\n../clips/a.mp4, pele \n,missing\nb.mp4,messi\n", encoding="utf-8")
+
+    assert read_manifest(str(manifest)) == [
+        (os.path.join(str(manifest.parent), "../clips/a.mp4"), "pele"),
+        (os.path.join(str(manifest.parent), "b.mp4"), "messi"),
+    ]
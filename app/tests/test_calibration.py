@@ -0,0 +1,36 @@
+import numpy as np
+from core.face_detection.calibration import calibrate_thresholds, stranger_scores
+
+CLASSES = np.array(["a", "b", "c"], dtype=object)
+
+
+def test_stranger_scores_drop_the_true_class():
+    probas = np.array([[0.7, 0.2, 0.1], [0.1, 0.3, 0.6]])
+    labels, confidences = stranger_scores(probas, CLASSES, ["a", "c"])
+    assert list(labels) == ["b", "b"]
+    np.testing.assert_allclose(confidences, [2 / 3, 0.75])
+
+
+def test_thresholds_follow_strangers_not_a_constant():
+    rng = np.random.default_rng(0)
+    rows, actual = [], []
+    # Người "a" giống "b" (người lạ dễ bị nhận là b), "c" tách biệt
+    for label, probas in (("a", [0.90, 0.09, 0.01]), ("b", [0.05, 0.90, 0.05]), ("c", [0.05, 0.35, 0.60])):
+        noise = rng.uniform(-0.02, 0.02, (40, 3))
+        rows.append(np.clip(np.asarray(probas) + noise, 1e-3, None))
+        actual += [label] * 40
+    probas = np.vstack(rows)
+    probas /= probas.sum(axis=1, keepdims=True)
+
+    thresholds = calibrate_thresholds(
+        probas, CLASSES, actual, target_accept=0.95, stranger_reject=0.5, min_threshold=0.3
+    )
+    # Người lạ che lớp thật của "a" có confidence ~0.9 cho "b" => ngưỡng của b cao,
+    # nhưng không vượt phân vị 5% điểm đúng của b
+    assert 0.85 < thresholds["b"] <= np.quantile(probas[40:80, 1], 0.05) + 1e-9
+    assert len(set(round(v, 2) for v in thresholds.values())) > 1
+
+
+def test_two_classes_keep_default_threshold():
+    probas = np.array([[0.8, 0.2], [0.3, 0.7]])
+    assert calibrate_thresholds(probas, np.array(["a", "b"]), ["a", "b"]) == {}
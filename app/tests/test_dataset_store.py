@@ -0,0 +1,67 @@
+import os
+import shutil
+import numpy as np
+import core.dataset_store as dataset_store
+from conftest import APP_DIR
+from core.dataset_store import DatasetStore
+
+SHIPPED_NAMES = os.path.join(APP_DIR, "data", "dataset", "names.pkl")
+
+
+def _labels_only_layout(root):
+    """Bố cục dữ liệu đi kèm repo: chỉ có names.pkl, không có faces.pkl."""
+    dataset_dir = os.path.join(root, "data", "dataset")
+    os.makedirs(dataset_dir)
+    shutil.copy(SHIPPED_NAMES, dataset_dir)
+    return dataset_dir
+
+
+def test_labels_only_layout_keeps_users(tmp_path):
+    store = DatasetStore(_labels_only_layout(str(tmp_path)))
+
+    assert len(store) == 0
+    assert store.has_user("pele")
+    assert set(store.legacy_users()) == {"mbappe", "pele", "ronaldo"}
+    assert sum(store.label_counts().values()) == 256
+    assert os.path.exists(os.path.join(store.root, "names.pkl"))
+
+
+def test_legacy_users_survive_append(tmp_path):
+    store = DatasetStore(_labels_only_layout(str(tmp_path)))
+    store.append(np.ones((2, store.dim), dtype=np.float32), ["new_user", "new_user"])
+
+    reopened = DatasetStore(store.root)
+    assert reopened.has_user("pele")
+    assert reopened.has_user("new_user")
+    assert reopened.labels() == ["new_user", "new_user"]
+
+
+def test_manifest_without_legacy_field_is_seeded(tmp_path):
+    dataset_dir = _labels_only_layout(str(tmp_path))
+    # Manifest tạo bởi phiên bản trước (chưa có legacy_users)
+    store = DatasetStore(dataset_dir)
+    manifest = store._empty_manifest()
+    del manifest["legacy_users"]
+    store._write_manifest(manifest)
+
+    assert DatasetStore(dataset_dir).has_user("ronaldo")
+
+
+def test_has_trained_data_with_shipped_layout(tmp_path, monkeypatch):
+    from utils.helpers import has_trained_data
+
+    _labels_only_layout(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dataset_store, "_stores", {})
+
+    assert has_trained_data("pele")
+    assert not has_trained_data("someone_else")
+
+
+def test_feature_label_counts_skip_legacy_users(tmp_path):
+    store = DatasetStore(_labels_only_layout(str(tmp_path)))
+    store.append(np.ones((3, store.dim), dtype=np.float32), ["new_user"] * 3)
+
+    # Người cũ vẫn được tính cho has_trained_data, nhưng không đủ để huấn luyện
+    assert set(store.label_counts()) == {"mbappe", "pele", "ronaldo", "new_user"}
+    assert store.feature_label_counts() == {"new_user": 3}
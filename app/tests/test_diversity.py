@@ -0,0 +1,37 @@
+import numpy as np
+from core.diversity import DiversityFilter
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_offer_rejects_near_duplicates_within_one_batch():
+    diversity = DiversityFilter(min_distance=0.05, capacity=8)
+    batch = [_unit(1, 0, 0), _unit(1, 0.01, 0), _unit(0, 1, 0), _unit(0, 1, 0.01)]
+
+    assert diversity.offer(batch).tolist() == [True, False, True, False]
+    assert len(diversity) == 2
+
+
+def test_offer_rejects_near_duplicates_of_the_reservoir():
+    diversity = DiversityFilter(min_distance=0.05, capacity=8)
+    assert diversity.offer(_unit(1, 0, 0)).tolist() == [True]
+
+    # Khoảng cách cosine phụ thuộc hướng, không phụ thuộc độ lớn vector
+    accepted = diversity.offer([10 * _unit(1, 0.01, 0), _unit(0, 0, 1)])
+    assert accepted.tolist() == [False, True]
+    assert len(diversity) == 2
+
+
+def test_offer_overwrites_oldest_vector_when_full():
+    diversity = DiversityFilter(min_distance=0.05, capacity=2)
+    first, second, third = _unit(1, 0, 0), _unit(0, 1, 0), _unit(0, 0, 1)
+    assert diversity.offer([first, second]).all()
+
+    assert diversity.offer(third).tolist() == [True]
+    assert len(diversity) == 2
+    # first đã bị ghi đè nên được nhận lại; second và third vẫn còn trong reservoir
+    assert diversity.offer([second, third]).tolist() == [False, False]
+    assert diversity.offer(first).tolist() == [True]
@@ -0,0 +1,19 @@
+import os
+import cv2
+from conftest import APP_DIR
+from core.data_collector.face_data_collector import collect_face_data
+from core.dataset_store import DatasetStore
+
+VIDEO = os.path.join(APP_DIR, "..", "image", "train", "pele1.mp4")
+
+
+def test_collect_face_data_returns_rows_appended(tmp_path):
+    dataset_dir = str(tmp_path / "dataset")
+    cap = cv2.VideoCapture(VIDEO)
+    try:
+        saved = collect_face_data(cap, "pele", dataset_dir, num_samples=30)
+    finally:
+        cap.release()
+
+    assert saved == len(DatasetStore(dataset_dir)) > 0
+    assert DatasetStore(dataset_dir).label_counts() == {"pele": saved}
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+import pytest
+from core.config import QUALITY_CONFIG
+from core.quality import score_faces
+
+
+def _old_is_good_quality(frame, x, y, w, h):
+    """is_good_quality trước khi chuyển sang score_faces (độ sáng > 50, Laplacian CV_64F > 100)."""
+    gray = cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
+    return gray.mean(), cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+def _frames():
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (80, 80, 3), dtype=np.uint8)
+    yield np.full((80, 80, 3), 30, dtype=np.uint8)  # tối, phẳng
+    yield np.full((80, 80, 3), 200, dtype=np.uint8)  # sáng nhưng không nét
+    yield noise
+    yield cv2.GaussianBlur(noise, (0, 0), 3)  # mờ
+    yield (noise // 4).astype(np.uint8)  # tối nhưng nét
+
+
+@pytest.mark.parametrize("frame", list(_frames()))
+def test_score_faces_matches_old_brightness_and_sharpness(frame):
+    box = (0, 0, frame.shape[1], frame.shape[0])
+    brightness, sharpness = _old_is_good_quality(frame, *box)
+    quality = score_faces(frame, [box])
+
+    assert quality["brightness"][0] == pytest.approx(brightness)
+    assert quality["sharpness"][0] == pytest.approx(sharpness, rel=1e-6, abs=1e-6)
+    assert quality["passed"][0] == (brightness > 50 and sharpness > 100)
+
+
+def test_score_faces_clips_boxes_to_frame():
+    frame = np.random.default_rng(1).integers(0, 256, (100, 100, 3), dtype=np.uint8)
+    quality = score_faces(frame, [(-20, -10, 60, 60), (70, 80, 50, 50)])
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    assert quality["size"].tolist() == [40, 20]
+    assert quality["brightness"][0] == pytest.approx(gray[0:50, 0:40].mean())
+    assert quality["brightness"][1] == pytest.approx(gray[80:100, 70:100].mean())
+    assert quality["passed"].all()
+
+
+def test_score_faces_skips_boxes_under_min_size():
+    frame = np.random.default_rng(2).integers(0, 256, (100, 100, 3), dtype=np.uint8)
+    # Box thứ hai chỉ còn 5 px sau khi cắt theo mép phải, box thứ ba nằm ngoài khung hình
+    boxes = [(5, 5, 8, 40), (95, 0, 30, 30), (200, 200, 30, 30), (20, 20, 40, 40)]
+    quality = score_faces(frame, boxes, config={**QUALITY_CONFIG, "min_size": 10})
+
+    assert quality["passed"].tolist() == [False, False, False, True]
+    for key in ("brightness", "sharpness", "size", "score"):
+        assert (quality[key][:3] == 0).all()
+
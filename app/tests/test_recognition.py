@@ -0,0 +1,30 @@
+import math
+import os
+import cv2
+from conftest import APP_DIR
+from core.face_detection.recognizer import FaceRecognizer
+from core.recognition import recognize_stream
+
+VIDEO = os.path.join(APP_DIR, "..", "image", "test", "pele.mp4")
+MODEL = os.path.join(APP_DIR, "data", "models", "model.pkl")
+
+
+def _run(recognizer, **kwargs):
+    cap = cv2.VideoCapture(VIDEO)
+    try:
+        return recognize_stream(cap, recognizer, lambda name, confidence, roi: (True, name), **kwargs)
+    finally:
+        cap.release()
+
+
+def test_min_frames_keeps_running_after_decision():
+    recognizer = FaceRecognizer.load(MODEL)
+    default = _run(recognizer)
+    full = _run(recognizer, min_frames=math.inf)
+
+    assert default["frames"] == default["frames_to_decision"]
+    assert full["frames"] > full["frames_to_decision"]
+    assert len(full["timings"]) == full["frames"]
+    # Chạy tiếp chỉ để đo, không đổi quyết định
+    assert full["decision"] == default["decision"]
+    assert full["frames_to_decision"] == default["frames_to_decision"]
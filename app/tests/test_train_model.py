@@ -0,0 +1,48 @@
+import numpy as np
+from core.dataset_store import DatasetStore
+from core.face_detection.recognizer import FaceRecognizer
+from core.train_model import update_model
+
+
+def _append_person(store, label, center, count=20, seed=0):
+    rng = np.random.default_rng(seed)
+    features = np.zeros((count, store.dim), dtype=np.float32)
+    features[:, center * 50:(center + 1) * 50] = 1.0
+    features += rng.normal(0, 0.05, features.shape).astype(np.float32)
+    store.append(np.abs(features), [label] * count)
+
+
+def test_update_model_mlp_retrains_with_new_person(tmp_path):
+    dataset_dir, save_path = str(tmp_path / "dataset"), str(tmp_path / "model.pkl")
+    store = DatasetStore(dataset_dir)
+    for i, label in enumerate(["a", "b", "c"]):
+        _append_person(store, label, i, seed=i)
+
+    assert update_model(model_type="mlp", dataset_dir=dataset_dir, save_path=save_path)
+    assert not FaceRecognizer.load(save_path).supports_partial_fit
+
+    _append_person(store, "d", 3, seed=3)
+    assert update_model(model_type="mlp", dataset_dir=dataset_dir, save_path=save_path)
+
+    recognizer = FaceRecognizer.load(save_path)
+    assert recognizer.model_type == "mlp"
+    assert set(recognizer.classes_) == {"a", "b", "c", "d"}
+    assert recognizer.trained_rows == 80
+
+
+def test_update_model_centroid_learns_only_new_rows(tmp_path):
+    dataset_dir, save_path = str(tmp_path / "dataset"), str(tmp_path / "model.pkl")
+    store = DatasetStore(dataset_dir)
+    for i, label in enumerate(["a", "b"]):
+        _append_person(store, label, i, seed=i)
+    assert update_model(model_type="centroid", dataset_dir=dataset_dir, save_path=save_path)
+
+    _append_person(store, "c", 2, seed=2)
+    assert update_model(model_type="centroid", dataset_dir=dataset_dir, save_path=save_path)
+
+    recognizer = FaceRecognizer.load(save_path)
+    assert recognizer.supports_partial_fit
+    assert list(recognizer.classes_) == ["a", "b", "c"]
+    assert recognizer.model._counts.tolist() == [20, 20, 20]
+    # Mẫu cũ của a, b làm người lạ mô phỏng: cả ba danh tính đều được hiệu chỉnh lại
+    assert set(recognizer.thresholds) == {"a", "b", "c"}
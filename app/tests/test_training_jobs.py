@@ -0,0 +1,39 @@
+import json
+import multiprocessing
+import time
+from core.config import TRAINING_CONFIG
+from core.dataset_store import DatasetStore
+from core.training_jobs import TrainingJobManager
+from test_train_model import _append_person
+
+
+def test_auto_search_fans_out_from_training_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # report_path tương đối của select_model
+    monkeypatch.setitem(TRAINING_CONFIG, "search", {
+        **TRAINING_CONFIG["search"],
+        "n_jobs": 2,
+        "candidates": {"centroid": {"temperature": [0.02, 0.05]}, "knn": {"n_neighbors": [3, 5]}},
+    })
+    store = DatasetStore(str(tmp_path / "dataset"))
+    for i, label in enumerate(["a", "b", "c"]):
+        _append_person(store, label, i, seed=i)
+
+    manager = TrainingJobManager(
+        dataset_dir=store.root,
+        save_path=str(tmp_path / "model.pkl"),
+        status_path=str(tmp_path / "status.json"),
+    )
+    # fork để process con thấy cấu hình đã sửa ở trên; cờ daemon vẫn như khi spawn
+    manager._context = multiprocessing.get_context("fork")
+    assert manager.submit("auto") == "started"
+    deadline = time.time() + 120
+    while manager.is_running() and time.time() < deadline:
+        time.sleep(0.2)
+
+    status = manager.status()
+    assert status["state"] == "done", status
+    with open(tmp_path / TRAINING_CONFIG["search"]["report_path"], encoding="utf-8") as f:
+        results = json.load(f)
+    # Với n_jobs=1 (loky lùi lại trong process daemon) mọi ứng viên chạy ngay trong job
+    assert all(result["pid"] != status["pid"] for result in results)
+    assert status["metrics"]["search_workers"] >= 1
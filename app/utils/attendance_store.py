@@ -0,0 +1,478 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+DB_PATH = "data/logs/attendance.db"
+LOG_DIR = "data/logs"
+ATTENDANCE_COLUMNS = [
+    "name",
+    "date",
+    "time-check-in",
+    "time-check-out",
+    "time-working",
+    "position",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time_check_in TEXT,
+    time_check_out TEXT,
+    time_working REAL,
+    position TEXT,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_user_date ON attendance (username, date);
+CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date);
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+CREATE TABLE IF NOT EXISTS deletions (
+    id INTEGER NOT NULL,
+    revision INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deletions_revision ON deletions (revision);
+"""
+
+# Trigger tăng số revision cho mọi thay đổi (kể cả từ process khác),
+# để AttendanceView chỉ đọc lại các dòng đã đổi
+_TRIGGERS = """
+CREATE INDEX IF NOT EXISTS idx_attendance_revision ON attendance (revision);
+CREATE TRIGGER IF NOT EXISTS trg_attendance_insert AFTER INSERT ON attendance BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'revision';
+    UPDATE attendance SET revision = (SELECT value FROM meta WHERE key = 'revision')
+    WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_attendance_update
+AFTER UPDATE OF username, name, date, time_check_in, time_check_out, time_working, position
+ON attendance BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'revision';
+    UPDATE attendance SET revision = (SELECT value FROM meta WHERE key = 'revision')
+    WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_attendance_delete AFTER DELETE ON attendance BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'revision';
+    INSERT INTO deletions (id, revision)
+    VALUES (OLD.id, (SELECT value FROM meta WHERE key = 'revision'));
+END;
+"""
+
+_SELECT = """
+SELECT id, username, name, date,
+       time_check_in AS "time-check-in",
+       time_check_out AS "time-check-out",
+       time_working AS "time-working",
+       position
+FROM attendance
+"""
+
+
+def _none_if_missing(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value is pd.NA:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def to_attendance_frame(df):
+    """Chuyển các cột ngày/giờ sang datetime như định dạng CSV cũ."""
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+    df["time-check-in"] = pd.to_datetime(
+        df["time-check-in"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
+    )
+    df["time-check-out"] = pd.to_datetime(
+        df["time-check-out"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
+    )
+    return df
+
+
+class DailyStatusIndex:
+    """
+    Chỉ mục trong bộ nhớ trạng thái điểm danh theo ngày: {date: {username: [check-in, check-out]}}.
+    - Một ngày được nạp bằng một truy vấn trên index (date) ở lần tra cứu đầu tiên,
+      nên khởi động lại chỉ cần đọc các dòng của hôm nay.
+    - Mỗi ngày lưu kèm meta.revision lúc nạp; mỗi lần tra cứu so với revision hiện tại
+      trong CSDL, nên ghi từ kết nối/luồng/process khác luôn làm ngày đó được nạp lại.
+    - Ghi qua AttendanceStore cập nhật chỉ mục trực tiếp nếu không có ghi nào xen giữa.
+    """
+
+    def __init__(self, store, max_days=7):
+        self.store = store
+        self.max_days = max_days
+        self._days = {}  # date -> (revision, {username: [check-in, check-out]})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _revision(conn):
+        return conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def _load_day(self, conn, date):
+        # Đọc revision và các dòng trong cùng một giao dịch để chúng khớp nhau
+        conn.execute("BEGIN")
+        try:
+            revision = self._revision(conn)
+            rows = conn.execute(
+                "SELECT username, MAX(time_check_in), MAX(time_check_out) FROM attendance "
+                "WHERE date = ? GROUP BY username",
+                (date,),
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        day = {username: [check_in, check_out] for username, check_in, check_out in rows}
+        with self._lock:
+            self._days[date] = (revision, day)
+            for old_date in sorted(self._days)[: -self.max_days]:
+                del self._days[old_date]
+        return day
+
+    def get(self, username, date):
+        """Trả về (đã check-in, đã check-out) của username trong ngày date."""
+        conn = self.store._connect()
+        revision = self._revision(conn)
+        with self._lock:
+            cached = self._days.get(date)
+        if cached is None or cached[0] != revision:
+            day = self._load_day(conn, date)
+        else:
+            day = cached[1]
+        status = day.get(username)
+        if status is None:
+            return False, False
+        return status[0] is not None, status[1] is not None
+
+    def record(self, username, date, before, after, check_in=None, check_out=None):
+        """
+        Cập nhật chỉ mục sau một lần ghi thành công.
+        - before/after: meta.revision ngay trước và sau lần ghi (trong cùng giao dịch).
+          Nếu ngày được nạp ở revision khác before thì đã có ghi khác xen giữa: bỏ ngày đó.
+        """
+        with self._lock:
+            cached = self._days.get(date)
+            if cached is None:
+                return  # Ngày chưa được nạp: lần tra cứu sau sẽ đọc từ CSDL
+            revision, day = cached
+            if revision != before:
+                del self._days[date]
+                return
+            status = day.setdefault(username, [None, None])
+            if check_in is not None:
+                status[0] = check_in
+            if check_out is not None:
+                status[1] = check_out
+            self._days[date] = (after, day)
+
+    def invalidate(self, date=None):
+        with self._lock:
+            if date is None:
+                self._days.clear()
+            else:
+                self._days.pop(date, None)
+
+
+class AttendanceStore:
+    """
+    Lưu điểm danh trong SQLite nhúng thay cho việc đọc-sửa-ghi lại cả file CSV.
+    - Index (username, date) giúp kiểm tra "hôm nay đã check-in chưa" và thêm bản ghi
+      không phụ thuộc độ dài lịch sử.
+    - Mỗi luồng dùng một kết nối riêng; chế độ WAL cho phép đọc song song khi ghi.
+    - Lần mở đầu tiên nhập dữ liệu từ các file attendances_{username}.csv cũ (một lần).
+    """
+
+    def __init__(self, db_path=DB_PATH, log_dir=LOG_DIR):
+        self.db_path = db_path
+        self.log_dir = log_dir
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self.status_index = DailyStatusIndex(self)
+        self.view = AttendanceView(self)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    columns = {row[1] for row in conn.execute("PRAGMA table_info(attendance)")}
+                    if "revision" not in columns:
+                        # CSDL tạo trước khi có revision: mọi dòng cũ coi như revision 0
+                        conn.execute(
+                            "ALTER TABLE attendance ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"
+                        )
+                    conn.executescript(_TRIGGERS)
+                    self._import_legacy_csv(conn)
+                    self._initialized = True
+        return conn
+
+    def _import_legacy_csv(self, conn):
+        """Nhập các file attendances_{username}.csv chưa được nhập."""
+        if not os.path.isdir(self.log_dir):
+            return
+        for file_name in sorted(os.listdir(self.log_dir)):
+            if not (file_name.startswith("attendances_") and file_name.endswith(".csv")):
+                continue
+            username = file_name[len("attendances_"):-len(".csv")]
+            file_path = os.path.join(self.log_dir, file_name)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute(
+                    "SELECT 1 FROM imported_files WHERE path = ?", (file_path,)
+                ).fetchone():
+                    conn.execute("COMMIT")
+                    continue
+                df = pd.read_csv(file_path, dtype=str).dropna(how="all")
+                rows = [
+                    (
+                        username,
+                        _none_if_missing(row.get("name")) or username,
+                        _none_if_missing(row.get("date")),
+                        _none_if_missing(row.get("time-check-in")),
+                        _none_if_missing(row.get("time-check-out")),
+                        float(row["time-working"])
+                        if _none_if_missing(row.get("time-working")) is not None
+                        else None,
+                        _none_if_missing(row.get("position")),
+                    )
+                    for _, row in df.iterrows()
+                    if _none_if_missing(row.get("date")) is not None
+                ]
+                conn.executemany(
+                    "INSERT INTO attendance (username, name, date, time_check_in, "
+                    "time_check_out, time_working, position) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    "INSERT INTO imported_files (path, rows) VALUES (?, ?)",
+                    (file_path, len(rows)),
+                )
+                conn.execute("COMMIT")
+                print(f"[DEBUG] Đã nhập {len(rows)} dòng từ {file_path} vào {self.db_path}")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                print(f"[ERROR] Không nhập được {file_path}: {e}")
+
+    def _query(self, sql, params=()):
+        df = pd.read_sql_query(sql, self._connect(), params=params)
+        return to_attendance_frame(df)
+
+    def fetch(self, username=None):
+        """Tất cả bản ghi (của một người dùng nếu có username), kèm cột id và username."""
+        if username:
+            return self._query(_SELECT + " WHERE username = ? ORDER BY id", (username,))
+        return self._query(_SELECT + " ORDER BY id")
+
+    @staticmethod
+    def _where(username=None, start_date=None, end_date=None):
+        clauses, params = [], []
+        if username:
+            clauses.append("username = ?")
+            params.append(username)
+        if start_date:
+            clauses.append("date >= ?")
+            params.append(str(start_date))
+        if end_date:
+            clauses.append("date <= ?")
+            params.append(str(end_date))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query(self, username=None, start_date=None, end_date=None, limit=None, offset=0):
+        """
+        Truy vấn có lọc theo người dùng và khoảng ngày (YYYY-MM-DD, gồm cả hai đầu),
+        chỉ đọc các dòng khớp nhờ index.
+        - limit/offset: chỉ lấy một trang kết quả (sắp theo ngày mới nhất trước).
+        """
+        where, params = self._where(username, start_date, end_date)
+        if limit is None:
+            return self._query(_SELECT + where + " ORDER BY date, id", params)
+        return self._query(
+            _SELECT + where + " ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+            params + [int(limit), int(offset)],
+        )
+
+    def count(self, username=None, start_date=None, end_date=None):
+        """Số dòng khớp bộ lọc, đếm trên index mà không đọc dữ liệu."""
+        where, params = self._where(username, start_date, end_date)
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM attendance" + where, params
+        ).fetchone()[0]
+
+    def revision(self):
+        """Số revision hiện tại; tăng sau mỗi lần thêm/sửa/xoá dòng."""
+        return self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'revision'"
+        ).fetchone()[0]
+
+    def changes_since(self, revision):
+        """(các dòng thêm/sửa sau revision, id các dòng bị xoá sau revision)."""
+        changed = self._query(_SELECT + " WHERE revision > ? ORDER BY id", (revision,))
+        deleted = [
+            row[0]
+            for row in self._connect().execute(
+                "SELECT id FROM deletions WHERE revision > ?", (revision,)
+            )
+        ]
+        return changed, deleted
+
+    def day_status(self, username, date):
+        """Trạng thái ngày của người dùng: (đã check-in, đã check-out), tra từ DailyStatusIndex."""
+        return self.status_index.get(username, date)
+
+    def check_in(self, username, name, date, timestamp, position):
+        """Thêm bản ghi check-in nếu hôm nay chưa có. Trả về (success, message)."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM attendance WHERE username = ? AND date = ? "
+                "AND time_check_in IS NOT NULL LIMIT 1",
+                (username, date),
+            ).fetchone()
+            if exists:
+                conn.execute("ROLLBACK")
+                return False, f"{name} đã check-in hôm nay rồi."
+            before = DailyStatusIndex._revision(conn)
+            conn.execute(
+                "INSERT INTO attendance (username, name, date, time_check_in, position) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (username, name, date, timestamp, position),
+            )
+            after = DailyStatusIndex._revision(conn)
+            conn.execute("COMMIT")
+            self.status_index.record(username, date, before, after, check_in=timestamp)
+            return True, ""
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def check_out(self, username, date, timestamp):
+        """Ghi giờ check-out cho bản ghi check-in hôm nay. Trả về (success, message)."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, time_check_in FROM attendance WHERE username = ? AND date = ? "
+                "AND time_check_in IS NOT NULL AND time_check_out IS NULL",
+                (username, date),
+            ).fetchall()
+            if not rows:
+                conn.execute("ROLLBACK")
+                return False, "Không tìm thấy bản ghi check-in cho ngày hôm nay."
+            before = DailyStatusIndex._revision(conn)
+            check_out_time = pd.to_datetime(timestamp)
+            for record_id, check_in in rows:
+                working = round(
+                    (check_out_time - pd.to_datetime(check_in)).total_seconds() / 3600, 2
+                )
+                conn.execute(
+                    "UPDATE attendance SET time_check_out = ?, time_working = ? WHERE id = ?",
+                    (timestamp, working, record_id),
+                )
+            after = DailyStatusIndex._revision(conn)
+            conn.execute("COMMIT")
+            self.status_index.record(username, date, before, after, check_out=timestamp)
+            return True, ""
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete_records(self, record_ids, chunk_size=500):
+        """Xoá nhiều bản ghi theo id trong một giao dịch. Trả về số dòng đã xoá."""
+        record_ids = [int(record_id) for record_id in record_ids]
+        if not record_ids:
+            return 0
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            dates, deleted = set(), 0
+            # Chia nhỏ để không vượt giới hạn số tham số của SQLite
+            for start in range(0, len(record_ids), chunk_size):
+                chunk = record_ids[start:start + chunk_size]
+                placeholders = ", ".join("?" * len(chunk))
+                dates.update(
+                    row[0]
+                    for row in conn.execute(
+                        f"SELECT DISTINCT date FROM attendance WHERE id IN ({placeholders})",
+                        chunk,
+                    )
+                )
+                deleted += conn.execute(
+                    f"DELETE FROM attendance WHERE id IN ({placeholders})", chunk
+                ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for date in dates:
+            self.status_index.invalidate(date)
+        return deleted
+
+
+class AttendanceView:
+    """
+    Bảng điểm danh gộp của mọi người dùng, giữ trong bộ nhớ giữa các lần rerun.
+    - Lần đầu đọc toàn bộ; các lần sau chỉ đọc dòng có revision mới hơn và áp dụng
+      danh sách dòng bị xoá, nên chi phí tỉ lệ với số thay đổi chứ không với lịch sử.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._df = None
+        self._revision = -1
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            current = self.store.revision()
+            if self._df is not None and current == self._revision:
+                return self._df
+            if self._df is None:
+                df = self.store.fetch().set_index("id")
+            else:
+                changed, deleted = self.store.changes_since(self._revision)
+                changed = changed.set_index("id")
+                stale = self._df.index.intersection(changed.index.union(deleted))
+                df = self._df.drop(index=stale)
+                if not changed.empty:
+                    df = pd.concat([df, changed]).sort_index() if not df.empty else changed
+                print(
+                    f"[DEBUG] AttendanceView: +{len(changed)} dòng đổi, -{len(deleted)} dòng xoá"
+                )
+            self._df = df
+            self._revision = current
+            return df
+
+    def frame(self):
+        """DataFrame gộp (cột username + các cột điểm danh), cột id là index."""
+        return self.refresh()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_attendance_store(db_path=DB_PATH):
+    """AttendanceStore dùng chung trong process cho file CSDL tương ứng."""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = AttendanceStore(db_path)
+            _stores[db_path] = store
+        return store
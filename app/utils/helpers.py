@@ -3,120 +3,94 @@ import time
 import pandas as pd
 from datetime import datetime
 import cv2
-import pickle
 import streamlit as st
+from core.dataset_store import DATASET_DIR, get_dataset_store
+from utils.attendance_store import ATTENDANCE_COLUMNS, get_attendance_store
 
 
 def read_attendance_csv(username=None):
-    """Đọc dữ liệu điểm danh từ tệp của người dùng hoặc tệp chung (cho admin)."""
-    if username:
-        log_file = f"data/logs/attendances_{username}.csv"
-    else:
-        log_file = "data/logs/attendances.csv"
-
+    """Đọc dữ liệu điểm danh của người dùng (hoặc của tất cả, cho admin) từ AttendanceStore."""
     try:
-        if not os.path.exists(log_file):
-            os.makedirs(os.path.dirname(log_file), exist_ok=True)
-            df = pd.DataFrame(
-                columns=[
-                    "name",
-                    "date",
-                    "time-check-in",
-                    "time-check-out",
-                    "time-working",
-                    "position",
-                ]
-            )
-            df.to_csv(log_file, index=False)
-            print(f"[DEBUG] Created new attendance CSV: {log_file}")
-            return df
-
-        df = pd.read_csv(log_file)
-        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
-        df["time-check-in"] = pd.to_datetime(
-            df["time-check-in"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
-        )
-        df["time-check-out"] = pd.to_datetime(
-            df["time-check-out"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
-        )
+        df = get_attendance_store().fetch(username)
         print(
-            f"[DEBUG] Loaded attendance CSV: {log_file}, shape={df.shape}, columns={df.columns.tolist()}"
+            f"[DEBUG] Loaded attendance for {username or 'all users'}, shape={df.shape}"
         )
-        return df
+        return df[ATTENDANCE_COLUMNS]
 
     except Exception as e:
-        print(f"[ERROR] Failed to read attendance CSV: {e}")
-        return pd.DataFrame(
-            columns=[
-                "name",
-                "date",
-                "time-check-in",
-                "time-check-out",
-                "time-working",
-                "position",
-            ]
-        )
+        print(f"[ERROR] Failed to read attendance: {e}")
+        return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
 
 
 def read_all_attendance_csv():
-    """Tải và gộp dữ liệu điểm danh từ tất cả các tệp của người dùng."""
-    log_dir = "data/logs"
-    os.makedirs(log_dir, exist_ok=True)
-    all_dfs = []
-    user_files = {}
-
+    """Dữ liệu điểm danh gộp của tất cả người dùng, lấy từ AttendanceView (cập nhật tăng dần)."""
     try:
-        for file_name in os.listdir(log_dir):
-            if file_name.startswith("attendances_") and file_name.endswith(".csv"):
-                username = file_name.replace("attendances_", "").replace(".csv", "")
-                file_path = os.path.join(log_dir, file_name)
-                user_files[username] = file_path
-                try:
-                    df = read_attendance_csv(username=username)
-                    if not df.empty:
-                        df = df.assign(username=username)
-                        all_dfs.append(df)
-                    print(
-                        f"[DEBUG] Loaded attendance CSV for {username}: {file_path}, shape={df.shape}"
-                    )
-                except Exception as e:
-                    print(f"[ERROR] Failed to read {file_path}: {e}")
-
-        if not all_dfs:
-            print("[DEBUG] No attendance CSV files found")
-            return (
-                pd.DataFrame(
-                    columns=[
-                        "name",
-                        "date",
-                        "time-check-in",
-                        "time-check-out",
-                        "time-working",
-                        "position",
-                    ]
-                ),
-                {},
-            )
-
-        combined_df = pd.concat(all_dfs, ignore_index=True)
-        print(f"[DEBUG] Combined attendance CSV, shape={combined_df.shape}")
+        store = get_attendance_store()
+        combined_df = store.view.frame()
+        if combined_df.empty:
+            print("[DEBUG] No attendance records found")
+            return pd.DataFrame(columns=ATTENDANCE_COLUMNS), {}
+
+        user_files = {username: store.db_path for username in combined_df["username"].unique()}
+        combined_df = combined_df.reset_index(drop=True)
+        print(f"[DEBUG] Combined attendance, shape={combined_df.shape}")
         return combined_df, user_files
 
     except Exception as e:
-        print(f"[ERROR] Failed to read attendance CSVs: {e}")
-        return (
-            pd.DataFrame(
-                columns=[
-                    "name",
-                    "date",
-                    "time-check-in",
-                    "time-check-out",
-                    "time-working",
-                    "position",
-                ]
-            ),
-            {},
+        print(f"[ERROR] Failed to read attendance records: {e}")
+        return pd.DataFrame(columns=ATTENDANCE_COLUMNS), {}
+
+
+def query_attendance(username=None, start_date=None, end_date=None):
+    """Truy vấn điểm danh có lọc theo người dùng và khoảng ngày, không tải toàn bộ lịch sử."""
+    try:
+        df = get_attendance_store().query(username, start_date, end_date)
+        print(
+            f"[DEBUG] Queried attendance user={username}, {start_date}..{end_date}, shape={df.shape}"
+        )
+        return df.drop(columns=["id"])
+    except Exception as e:
+        print(f"[ERROR] Failed to query attendance: {e}")
+        return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+
+
+def count_attendance(username=None, start_date=None, end_date=None):
+    """Số dòng điểm danh khớp bộ lọc."""
+    try:
+        return get_attendance_store().count(username, start_date, end_date)
+    except Exception as e:
+        print(f"[ERROR] Failed to count attendance: {e}")
+        return 0
+
+
+def query_attendance_page(username=None, start_date=None, end_date=None, page=1, page_size=50):
+    """
+    Một trang dòng điểm danh (mới nhất trước) kèm cột id, cho phần quản lý/xoá.
+    - Tổng số dòng (để tính số trang) lấy bằng count_attendance(), không đếm lại ở đây.
+    - Trả về: DataFrame của trang.
+    """
+    try:
+        return get_attendance_store().query(
+            username,
+            start_date,
+            end_date,
+            limit=page_size,
+            offset=(max(1, page) - 1) * page_size,
         )
+    except Exception as e:
+        print(f"[ERROR] Failed to query attendance page: {e}")
+        return pd.DataFrame(columns=["id", "username"] + ATTENDANCE_COLUMNS)
+
+
+def delete_attendance_records(record_ids):
+    """Xoá các dòng điểm danh theo id trong một lần ghi. Trả về số dòng đã xoá."""
+    try:
+        deleted = get_attendance_store().delete_records(record_ids)
+        print(f"[DEBUG] Deleted {deleted} attendance row(s)")
+        return deleted
+    except Exception as e:
+        print(f"[ERROR] Failed to delete attendance records: {e}")
+        return 0
 
 
 def preprocess_attendance(df):
@@ -140,7 +114,6 @@ def preprocess_attendance(df):
 
 def append_attendance_log(name, image, position, action):
     """Append or update attendance log and save image."""
-    log_file = f"data/logs/attendances_{name}.csv"
     date = datetime.now().strftime("%Y-%m-%d")
     image_dir = f"data/logs/images/by_date/{date}"
     os.makedirs(image_dir, exist_ok=True)
@@ -157,77 +130,25 @@ def append_attendance_log(name, image, position, action):
         except Exception as e:
             print(f"[ERROR] Failed to save image {image_path}: {e}")
 
-    df = read_attendance_csv(username=name)
-    print(
-        f"[DEBUG] Before append, DataFrame shape: {df.shape}, action={action}, name={name}"
-    )
-
-    if action == "check-in":
-        mask = (
-            (df["name"] == name)
-            & (df["date"].dt.date == pd.to_datetime(date).date())
-            & (df["time-check-in"].notna())
-        )
-        if mask.any():
-            print(f"[DEBUG] Check-in already exists for {name} on {date}")
-            return False, f"{name} đã check-in hôm nay rồi."
-
-        new_record = pd.DataFrame(
-            {
-                "name": [name],
-                "date": [date],
-                "time-check-in": [timestamp],
-                "time-check-out": [pd.NA],
-                "time-working": [pd.NA],
-                "position": [position],
-            }
-        )
-        if df.empty:
-            df = new_record
-        else:
-            df = pd.concat([df.dropna(how="all"), new_record], ignore_index=True)
-
-    elif action == "check-out":
-        mask = (
-            (df["name"] == name)
-            & (df["date"].dt.date == pd.to_datetime(date).date())
-            & (df["time-check-in"].notna())
-            & (df["time-check-out"].isna())
-        )
-        print(f"[DEBUG] Check-out mask: {mask.sum()} rows matched")
-
-        if mask.any():
-            df.loc[mask, "time-check-out"] = timestamp
-            df.loc[mask, "time-working"] = df.loc[mask].apply(
-                lambda row: round(
-                    (
-                        pd.to_datetime(row["time-check-out"])
-                        - pd.to_datetime(row["time-check-in"])
-                    ).total_seconds()
-                    / 3600,
-                    2,
-                ),
-                axis=1,
-            )
-        else:
-            print(f"[DEBUG] No matching check-in record for {name} on {date}")
-            return False, f"Không tìm thấy bản ghi check-in cho ngày hôm nay."
-
+    store = get_attendance_store()
     try:
-        if os.path.exists(log_file):
-            if not os.access(log_file, os.W_OK):
-                print(f"[ERROR] No write permission for {log_file}")
-                return False, f"Không có quyền ghi vào file {log_file}"
-
-        df.to_csv(log_file, index=False)
-        print(
-            f"[DEBUG] Saved attendance log to {log_file}, new shape={df.shape}, data=\n{df.tail(1)}"
-        )
-        return True, f"Điểm danh {action} thành công cho {name}"
+        if action == "check-in":
+            success, msg = store.check_in(name, name, date, timestamp, position)
+        elif action == "check-out":
+            success, msg = store.check_out(name, date, timestamp)
+        else:
+            return False, "Hành động không hợp lệ."
     except Exception as e:
         print(f"[ERROR] Failed to save attendance log: {e}")
         return False, f"Lỗi khi lưu log điểm danh: {e}"
 
+    if not success:
+        print(f"[DEBUG] {action} rejected for {name} on {date}: {msg}")
+        return False, msg
+
+    print(f"[DEBUG] Saved attendance {action} for {name} at {timestamp} to {store.db_path}")
+    return True, f"Điểm danh {action} thành công cho {name}"
+
 
 def is_action_allowed(name: str, action: str) -> tuple[bool, str]:
     """Kiểm tra xem hành động check-in/check-out có được phép thực hiện không."""
@@ -236,29 +157,21 @@ def is_action_allowed(name: str, action: str) -> tuple[bool, str]:
         f"[DEBUG] is_action_allowed: input_name={name}, username={username}, action={action}"
     )
 
-    df = read_attendance_csv(username=username)
-    if df.empty:
-        if action == "check-in":
-            return True, ""
-        else:
-            print(f"[DEBUG] Empty DataFrame, cannot check-out for {username}")
-            return False, f"{username} chưa check-in nên không thể check-out."
-
-    today = datetime.now().date()
-    df_today = df[(df["name"] == username) & (df["date"].dt.date == today)]
-    print(f"[DEBUG] df_today rows: {df_today.shape[0]} for {username} on {today}")
+    today = datetime.now().strftime("%Y-%m-%d")
+    checked_in, checked_out = get_attendance_store().day_status(username, today)
+    print(f"[DEBUG] {username} on {today}: checked_in={checked_in}, checked_out={checked_out}")
 
     if action == "check-in":
-        if not df_today.empty and df_today["time-check-in"].notna().any():
+        if checked_in:
             print(f"[DEBUG] {username} already checked in today")
             return False, f"{username} đã check-in hôm nay rồi."
         else:
             return True, ""
     elif action == "check-out":
-        if df_today.empty or not df_today["time-check-in"].notna().any():
+        if not checked_in:
             print(f"[DEBUG] No check-in found for {username} today")
             return False, f"{username} chưa check-in nên không thể check-out."
-        elif df_today["time-check-out"].notna().any():
+        elif checked_out:
             print(f"[DEBUG] {username} already checked out today")
             return False, f"{username} đã check-out hôm nay rồi."
         else:
@@ -267,107 +180,29 @@ def is_action_allowed(name: str, action: str) -> tuple[bool, str]:
 
 
 def has_trained_data(username):
-    """Kiểm tra xem username có dữ liệu khuôn mặt trong names.pkl hay không."""
-    label_path = "data/dataset/names.pkl"
-    if not os.path.exists(label_path):
-        print(f"[DEBUG] File {label_path} không tồn tại.")
-        return False
+    """Kiểm tra xem username có dữ liệu khuôn mặt trong tập dữ liệu hay không."""
+    store = get_dataset_store(DATASET_DIR)
     try:
-        with open(label_path, "rb") as f:
-            labels = pickle.load(f)
-        has_data = username in labels
+        has_data = store.has_user(username)
         print(f"[DEBUG] Kiểm tra dữ liệu khuôn mặt cho {username}: {has_data}")
         return has_data
     except Exception as e:
-        print(f"[ERROR] Lỗi khi đọc {label_path}: {e}")
+        print(f"[ERROR] Lỗi khi đọc tập dữ liệu {store.root}: {e}")
         return False
 
 
 def load_attendance_history(username):
     """Tải lịch sử điểm danh cho người dùng cụ thể."""
-    attendance_path = f"data/logs/attendances_{username}.csv"
-    log_dir = "data/logs"
-
     try:
-        if not os.access(log_dir, os.W_OK) and os.path.exists(log_dir):
-            print(f"[ERROR] No write permission for directory {log_dir}")
-            return pd.DataFrame(
-                columns=[
-                    "name",
-                    "date",
-                    "time-check-in",
-                    "time-check-out",
-                    "time-working",
-                    "position",
-                ]
-            )
-
-        if not os.path.exists(attendance_path):
-            os.makedirs(log_dir, exist_ok=True)
-            df = pd.DataFrame(
-                columns=[
-                    "name",
-                    "date",
-                    "time-check-in",
-                    "time-check-out",
-                    "time-working",
-                    "position",
-                ]
-            )
-            try:
-                df.to_csv(attendance_path, index=False)
-                print(
-                    f"[DEBUG] Created new attendance CSV for {username}: {attendance_path}"
-                )
-            except Exception as e:
-                print(f"[ERROR] Failed to create CSV {attendance_path}: {e}")
-                return pd.DataFrame(
-                    columns=[
-                        "name",
-                        "date",
-                        "time-check-in",
-                        "time-check-out",
-                        "time-working",
-                        "position",
-                    ]
-                )
-            return df
-
-        df = pd.read_csv(attendance_path)
-        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
-        df["time-check-in"] = pd.to_datetime(
-            df["time-check-in"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
-        )
-        df["time-check-out"] = pd.to_datetime(
-            df["time-check-out"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
-        )
-        df_user = df[
-            [
-                "name",
-                "date",
-                "time-check-in",
-                "time-check-out",
-                "time-working",
-                "position",
-            ]
-        ]
+        df_user = get_attendance_store().fetch(username)[ATTENDANCE_COLUMNS]
         print(
-            f"[DEBUG] Loaded attendance history for {username}, shape={df_user.shape}, data={df_user.to_dict()}"
+            f"[DEBUG] Loaded attendance history for {username}, shape={df_user.shape}"
         )
         return df_user
 
     except Exception as e:
         print(f"[ERROR] Lỗi khi tải lịch sử điểm danh cho {username}: {e}")
-        return pd.DataFrame(
-            columns=[
-                "name",
-                "date",
-                "time-check-in",
-                "time-check-out",
-                "time-working",
-                "position",
-            ]
-        )
+        return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
 
 
 def save_uploaded_video(